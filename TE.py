@@ -1,106 +1,79 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import json
-import tkinter as tk
-from tkinter import ttk, messagebox
-from pathlib import Path
-from typing import Optional, Dict, List
+import time
+_START = time.perf_counter()
+
 import os
 import sys
 
+from thermo_core import KTypeConverter  # 兼容 from TE import KTypeConverter
+from trend import RingBuffer, SimulatedSource, decimate
+
+# tkinter 只在启动界面时导入，见 load_tk
+tk = ttk = messagebox = filedialog = None
+
+# 实时曲线: 缓冲区容量 (点)、刷新周期 (毫秒)、可见时间窗 (秒)
+TREND_CAPACITY = 600000
+TREND_INTERVAL_MS = 33
+TREND_SPANS = (10, 60, 120)
+
+# 批量转换: 表格可见行数、进度轮询周期 (毫秒)
+BATCH_VISIBLE_ROWS = 12
+BATCH_POLL_MS = 100
+BATCH_DIRECTIONS = {'热电势→温度': 'mv2t', '温度→热电势': 't2mv'}
+
+# 启动耗时记录 (秒): 导入、数据加载、界面构建
+STARTUP_TIMING: dict = {'core_import': time.perf_counter() - _START}
+
+def load_tk() -> None:
+    """导入 tkinter，只导入一次"""
+    global tk, ttk, messagebox, filedialog
+    if tk is None:
+        start = time.perf_counter()
+        import tkinter
+        from tkinter import ttk as _ttk, messagebox as _messagebox, filedialog as _filedialog
+        tk, ttk, messagebox, filedialog = tkinter, _ttk, _messagebox, _filedialog
+        STARTUP_TIMING['tk_import'] = time.perf_counter() - start
+
 def check_environment() -> None:
     """检查运行环境"""
     print(f"当前工作目录: {os.getcwd()}")
     print(f"Python可执行文件: {sys.executable}")
     print(f"程序文件位置: {os.path.abspath(__file__)}")
 
-class KTypeConverter:
-    def __init__(self):
-        self.types: Dict[str, Dict] = {}
-        self.current_type: str = "K"
-        self.load_data()
-        
-    def load_data(self) -> None:
-        """加载热电偶分度表数据"""
-        try:
-            if getattr(sys, 'frozen', False):
-                base_path = sys._MEIPASS
-            else:
-                base_path = Path(__file__).parent
-                
-            data_file = Path(base_path) / 'thermocouple_data.json'
-            print(f"尝试加载数据文件: {data_file}")
-            
-            if not data_file.exists():
-                raise FileNotFoundError(f"文件不存在: {data_file}")
-                
-            with open(data_file, 'r', encoding='utf-8', errors='ignore') as f:
-                data = json.load(f)
-                if 'types' not in data:
-                    raise json.JSONDecodeError("数据格式错误：缺少类型数据", "", 0)
-                self.types = data['types']
-                print("数据加载成功")
-        except FileNotFoundError as e:
-            raise RuntimeError(f"找不到数据文件: {str(e)}")
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"数据文件格式错误: {str(e)}")
-        except Exception as e:
-            raise RuntimeError(f"加载数据时发生错误: {str(e)}")
-
-    def set_type(self, type_name: str) -> None:
-        """设置当前热电偶类型"""
-        if type_name not in self.types:
-            raise ValueError(f"不支持的热电偶类型: {type_name}")
-        self.current_type = type_name
-
-    def get_current_range(self) -> Dict[str, float]:
-        """获取当前类型的范围"""
-        return self.types[self.current_type]['range']
-
-    def get_current_data(self) -> List[Dict[str, float]]:
-        """获取当前类型的数据"""
-        return self.types[self.current_type]['data']
-
-    def temp_to_mv(self, temp: float) -> Optional[float]:
-        """温度转换为热电势"""
-        range_data = self.get_current_range()
-        if not range_data['temp_min'] <= temp <= range_data['temp_max']:
-            raise ValueError(
-                f"温度超出范围 ({range_data['temp_min']}°C ~ {range_data['temp_max']}°C)"
-            )
-        
-        data = self.get_current_data()
-        for i in range(len(data) - 1):
-            t1, t2 = data[i]['temp'], data[i + 1]['temp']
-            if t1 <= temp <= t2:
-                mv1, mv2 = data[i]['mv'], data[i + 1]['mv']
-                return mv1 + (temp - t1) * (mv2 - mv1) / (t2 - t1)
-        return None
-
-    def mv_to_temp(self, mv: float) -> Optional[float]:
-        """热电势转换为温度"""
-        range_data = self.get_current_range()
-        if not range_data['mv_min'] <= mv <= range_data['mv_max']:
-            raise ValueError(
-                f"热电势超出范围 ({range_data['mv_min']}mV ~ {range_data['mv_max']}mV)"
-            )
-        
-        data = self.get_current_data()
-        for i in range(len(data) - 1):
-            mv1, mv2 = data[i]['mv'], data[i + 1]['mv']
-            if mv1 <= mv <= mv2:
-                t1, t2 = data[i]['temp'], data[i + 1]['temp']
-                return t1 + (mv - mv1) * (t2 - t1) / (mv2 - mv1)
-        return None
+def report_startup_timing() -> str:
+    """格式化启动耗时报告"""
+    labels = [
+        ('core_import', '导入转换核心'),
+        ('tk_import', '导入 tkinter'),
+        ('data_load', '加载分度表'),
+        ('window', '创建主窗口'),
+        ('ui_build', '构建界面'),
+        ('total', '启动总耗时'),
+    ]
+    lines = ["启动耗时:"]
+    for key, label in labels:
+        if key in STARTUP_TIMING:
+            lines.append(f"  {label:<10} {STARTUP_TIMING[key] * 1000:8.1f} ms")
+    return "\n".join(lines)
 
 class ThermocoupleApp:
     def __init__(self):
+        load_tk()
+        start = time.perf_counter()
         self.converter = KTypeConverter()
+        STARTUP_TIMING['data_load'] = time.perf_counter() - start
+
+        start = time.perf_counter()
         self.window = tk.Tk()
+        STARTUP_TIMING['window'] = time.perf_counter() - start
+
+        start = time.perf_counter()
         self.current_type = tk.StringVar(value="K")
         self.setup_ui()
         self.setup_style()
+        STARTUP_TIMING['ui_build'] = time.perf_counter() - start
 
     def setup_style(self):
         """设置界面样式"""
@@ -137,6 +110,7 @@ class ThermocoupleApp:
         
         notebook = ttk.Notebook(main_container)
         notebook.pack(expand=True, fill='both')
+        self.notebook = notebook
         
         # 创建温度->热电势选项卡
         temp_frame = self.create_temp_to_mv_tab(notebook)
@@ -146,6 +120,14 @@ class ThermocoupleApp:
         mv_frame = self.create_mv_to_temp_tab(notebook)
         notebook.add(mv_frame, text=' 热电势→温度 ', padding=10)
         
+        # 创建实时曲线选项卡
+        self.trend_frame = self.create_trend_tab(notebook)
+        notebook.add(self.trend_frame, text=' 实时曲线 ', padding=10)
+        
+        # 创建批量转换选项卡
+        batch_frame = self.create_batch_tab(notebook)
+        notebook.add(batch_frame, text=' 批量转换 ', padding=10)
+        
         # 添加版权信息
         footer = ttk.Label(self.window,
                           text="热电偶温度-热电势转换器 © 2024",
@@ -174,6 +156,11 @@ class ThermocoupleApp:
         """热电偶类型改变时的处理"""
         self.converter.set_type(self.current_type.get())
         self.update_range_info()
+        if self.trend_source is not None and self.trend_source.running:
+            # 模拟采集按新类型重新开始
+            self.toggle_trend_source()
+            self.trend_buffer.clear()
+            self.toggle_trend_source()
 
     def update_range_info(self):
         """更新范围信息"""
@@ -280,6 +267,272 @@ class ThermocoupleApp:
         
         return frame
 
+    def create_trend_tab(self, parent):
+        """创建实时曲线标签页"""
+        frame = ttk.Frame(parent)
+        self.trend_buffer = RingBuffer(TREND_CAPACITY)
+        self.trend_source = None
+        self.trend_span = tk.IntVar(value=TREND_SPANS[0])
+        self._trend_drawn = None  # 上次绘制时的 (缓冲区版本, 画布尺寸, 时间窗)
+
+        controls = ttk.Frame(frame)
+        controls.pack(fill='x')
+        self.trend_button = ttk.Button(controls, text="开始模拟采集", command=self.toggle_trend_source)
+        self.trend_button.pack(side='left')
+        ttk.Label(controls, text="时间窗(秒):").pack(side='left', padx=5)
+        ttk.Combobox(controls, textvariable=self.trend_span, values=TREND_SPANS,
+                     width=5, state='readonly').pack(side='left')
+        self.trend_status = ttk.Label(controls, text="")
+        self.trend_status.pack(side='left', padx=5)
+
+        self.trend_canvas = tk.Canvas(frame, background='white', highlightthickness=0)
+        self.trend_canvas.pack(expand=True, fill='both', pady=10)
+        # 曲线只用一个折线对象，刷新时只更新坐标
+        self.trend_line = self.trend_canvas.create_line(0, 0, 0, 0, fill='#2E7D32')
+        self.trend_max_label = self.trend_canvas.create_text(4, 2, anchor='nw', fill='#666666')
+        self.trend_min_label = self.trend_canvas.create_text(4, 0, anchor='sw', fill='#666666')
+
+        self.window.after(TREND_INTERVAL_MS, self.refresh_trend)
+        return frame
+
+    def push_readings(self, times, temps):
+        """外部采集线程写入读数 (线程安全)，曲线在下一次刷新时更新"""
+        self.trend_buffer.extend(times, temps)
+
+    def toggle_trend_source(self):
+        """启动/停止模拟采集"""
+        if self.trend_source is not None and self.trend_source.running:
+            self.trend_source.stop()
+            self.trend_button.config(text="开始模拟采集")
+            return
+        converter = self.converter.get_converter(self.current_type.get())
+        self.trend_source = SimulatedSource(self.trend_buffer, converter)
+        self.trend_source.start()
+        self.trend_button.config(text="停止模拟采集")
+
+    def refresh_trend(self):
+        """按显示刷新率重绘曲线: 只在标签页可见且数据或尺寸变化时绘制"""
+        self.window.after(TREND_INTERVAL_MS, self.refresh_trend)
+        if self.notebook.select() != str(self.trend_frame):
+            return
+        canvas = self.trend_canvas
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        span = self.trend_span.get()
+        state = (self.trend_buffer.version, width, height, span)
+        if state == self._trend_drawn or width < 2 or height < 2:
+            return
+        self._trend_drawn = state
+
+        # 只复制可见时间窗内的数据
+        times, temps = self.trend_buffer.window(span)
+        if not times:
+            canvas.coords(self.trend_line, 0, 0, 0, 0)
+            return
+        t1 = times[-1]
+        cols, mins, maxs = decimate(times, temps, t1 - span, t1, width)
+        if not cols:
+            return
+        low, high = min(mins), max(maxs)
+        pad = (high - low) * 0.05 or 1.0
+        low, high = low - pad, high + pad
+        scale = (height - 1) / (high - low)
+        # 每列画一条从最小值到最大值的竖线，相邻列首尾相连
+        coords = []
+        for x, y_min, y_max in zip(cols, mins, maxs):
+            coords += (x, (high - y_min) * scale, x, (high - y_max) * scale)
+        if len(coords) < 4:
+            coords += coords
+        canvas.coords(self.trend_line, coords)
+        canvas.itemconfig(self.trend_max_label, text=f"{high:.1f}°C")
+        canvas.coords(self.trend_min_label, 4, height - 2)
+        canvas.itemconfig(self.trend_min_label, text=f"{low:.1f}°C")
+        self.trend_status.config(text=f"{len(cols)} 列 / {len(self.trend_buffer):,} 点")
+
+    def create_batch_tab(self, parent):
+        """创建批量转换标签页"""
+        frame = ttk.Frame(parent)
+        self.batch_job = None
+        self.batch_export = None  # 导出线程
+        self.batch_offset = 0
+        self.batch_shown = None  # 上次填充表格时的 (任务, 已转换行数, 起始行)
+        self.batch_direction = tk.StringVar(value=next(iter(BATCH_DIRECTIONS)))
+
+        controls = ttk.Frame(frame)
+        controls.pack(fill='x')
+        ttk.Combobox(controls, textvariable=self.batch_direction, values=list(BATCH_DIRECTIONS),
+                     width=12, state='readonly').pack(side='left')
+        self.batch_buttons = [
+            ttk.Button(controls, text="打开文件", command=self.open_batch_file),
+            ttk.Button(controls, text="转换粘贴内容", command=self.convert_pasted),
+            ttk.Button(controls, text="导出CSV", command=self.export_batch),
+        ]
+        for button in self.batch_buttons:
+            button.pack(side='left', padx=2)
+        self.batch_cancel_button = ttk.Button(controls, text="取消", command=self.cancel_batch, state='disabled')
+        self.batch_cancel_button.pack(side='left', padx=2)
+
+        self.batch_text = tk.Text(frame, height=4, font=('Consolas', 10))
+        self.batch_text.pack(fill='x', pady=5)
+
+        self.batch_progress = ttk.Progressbar(frame, maximum=1.0)
+        self.batch_progress.pack(fill='x')
+        self.batch_status = ttk.Label(frame, text="每行一个数值，或打开 CSV 文件 (取第一列)")
+        self.batch_status.pack(fill='x')
+
+        # 虚拟表格: 只创建可见行数的条目，滚动时替换内容，不随数据量增长
+        table = ttk.Frame(frame)
+        table.pack(expand=True, fill='both')
+        self.batch_tree = ttk.Treeview(table, columns=('index', 'input', 'result'), show='headings',
+                                       height=BATCH_VISIBLE_ROWS, selectmode='none')
+        for column, text, width in (('index', '行号', 70), ('input', '输入', 120), ('result', '结果', 120)):
+            self.batch_tree.heading(column, text=text)
+            self.batch_tree.column(column, width=width, anchor='e')
+        for i in range(BATCH_VISIBLE_ROWS):
+            self.batch_tree.insert('', 'end', iid=f"row{i}", values=('', '', ''))
+        scrollbar = ttk.Scrollbar(table, orient='vertical', command=self.on_batch_scroll)
+        self.batch_scrollbar = scrollbar
+        self.batch_tree.pack(side='left', expand=True, fill='both')
+        scrollbar.pack(side='right', fill='y')
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.batch_tree.bind(sequence, self.on_batch_wheel)
+        return frame
+
+    def open_batch_file(self):
+        """选择文件并开始转换"""
+        path = filedialog.askopenfilename(filetypes=[("CSV/文本", "*.csv *.txt"), ("所有文件", "*.*")])
+        if path:
+            self.start_batch(source=path)
+
+    def convert_pasted(self):
+        """转换粘贴的文本"""
+        text = self.batch_text.get('1.0', 'end')
+        if not text.strip():
+            messagebox.showerror("错误", "请先粘贴要转换的数值")
+            return
+        self.start_batch(text=text)
+
+    def start_batch(self, source=None, text=None):
+        """启动后台转换任务"""
+        from batch_convert import BatchJob
+        if self.batch_job is not None and self.batch_job.running:
+            self.batch_job.cancel()
+        converter = self.converter.get_converter(self.current_type.get())
+        self.batch_job = BatchJob(converter, BATCH_DIRECTIONS[self.batch_direction.get()],
+                                  source=source, text=text)
+        self.batch_offset = 0
+        self.batch_job.start()
+        self.set_batch_busy(True)
+        self.window.after(BATCH_POLL_MS, self.poll_batch, self.batch_job)
+
+    def cancel_batch(self):
+        """取消正在进行的转换"""
+        if self.batch_job is not None:
+            self.batch_job.cancel()
+
+    def set_batch_busy(self, busy: bool):
+        """转换/导出期间禁用按钮"""
+        for button in self.batch_buttons:
+            button.config(state='disabled' if busy else 'normal')
+        self.batch_cancel_button.config(state='normal' if busy else 'disabled')
+
+    def poll_batch(self, job):
+        """定时读取工作线程的进度，所有界面操作都在主线程进行"""
+        if job is not self.batch_job:
+            return  # 已被新任务取代
+        self.batch_progress['value'] = job.progress
+        self.refresh_batch_table()
+        if job.total is None:
+            self.batch_status.config(text=f"正在转换... 已完成 {job.done:,} 行")
+            self.window.after(BATCH_POLL_MS, self.poll_batch, job)
+            return
+        self.set_batch_busy(False)
+        if job.error is not None:
+            self.batch_status.config(text=f"转换失败，已完成 {job.done:,} 行")
+            messagebox.showerror("错误", f"转换失败: {job.error}")
+        elif job.cancelled:
+            self.batch_status.config(text=f"已取消，已完成 {job.done:,} 行")
+        else:
+            self.batch_status.config(text=f"转换完成，共 {job.done:,} 行")
+
+    def refresh_batch_table(self):
+        """按当前滚动位置填充可见行"""
+        job = self.batch_job
+        total = job.done if job is not None else 0
+        self.batch_offset = max(0, min(self.batch_offset, total - BATCH_VISIBLE_ROWS))
+        state = (job, total, self.batch_offset)
+        if state == self.batch_shown:
+            return
+        self.batch_shown = state
+        rows = job.rows(self.batch_offset, self.batch_offset + BATCH_VISIBLE_ROWS) if job else []
+        for i in range(BATCH_VISIBLE_ROWS):
+            if i < len(rows):
+                x, y = rows[i]
+                values = (self.batch_offset + i + 1,
+                          '' if x != x else f"{x:.3f}", '无效' if y != y else f"{y:.3f}")
+            else:
+                values = ('', '', '')
+            self.batch_tree.item(f"row{i}", values=values)
+        if total > BATCH_VISIBLE_ROWS:
+            self.batch_scrollbar.set(self.batch_offset / total,
+                                     (self.batch_offset + BATCH_VISIBLE_ROWS) / total)
+        else:
+            self.batch_scrollbar.set(0, 1)
+
+    def on_batch_scroll(self, action, amount, unit=None):
+        """滚动条回调: moveto 比例 / scroll 行数或页数"""
+        total = self.batch_job.done if self.batch_job is not None else 0
+        if action == 'moveto':
+            self.batch_offset = int(float(amount) * total)
+        elif action == 'scroll':
+            step = BATCH_VISIBLE_ROWS if unit == 'pages' else 1
+            self.batch_offset += int(amount) * step
+        self.refresh_batch_table()
+
+    def on_batch_wheel(self, event):
+        """鼠标滚轮滚动表格"""
+        if getattr(event, 'num', None) == 4 or event.delta > 0:
+            self.on_batch_scroll('scroll', -3)
+        else:
+            self.on_batch_scroll('scroll', 3)
+        return 'break'
+
+    def export_batch(self):
+        """在后台线程导出结果为 CSV"""
+        import threading
+        job = self.batch_job
+        if job is None or not job.done:
+            messagebox.showerror("错误", "没有可导出的结果")
+            return
+        path = filedialog.asksaveasfilename(defaultextension='.csv', filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        state = {'written': 0, 'error': None}
+
+        def run():
+            try:
+                job.export_csv(path, progress=lambda n: state.__setitem__('written', n))
+            except OSError as e:
+                state['error'] = e
+
+        self.batch_export = threading.Thread(target=run, name='batch-export', daemon=True)
+        self.batch_export.start()
+        self.set_batch_busy(True)
+        self.batch_cancel_button.config(state='disabled')
+        self.window.after(BATCH_POLL_MS, self.poll_export, job, path, state)
+
+    def poll_export(self, job, path, state):
+        """定时读取导出进度"""
+        self.batch_progress['value'] = state['written'] / job.done
+        if self.batch_export.is_alive():
+            self.batch_status.config(text=f"正在导出... {state['written']:,} / {job.done:,} 行")
+            self.window.after(BATCH_POLL_MS, self.poll_export, job, path, state)
+            return
+        self.set_batch_busy(False)
+        if state['error'] is not None:
+            messagebox.showerror("错误", f"导出失败: {state['error']}")
+        else:
+            self.batch_status.config(text=f"已导出 {job.done:,} 行到 {path}")
+
     def center_window(self):
         """使窗口居中显示"""
         self.window.update_idletasks()
@@ -317,13 +570,20 @@ class ThermocoupleApp:
         except ValueError as e:
             messagebox.showerror("错误", str(e))
 
-    def run(self):
-        """运行应用"""
+    def run(self, show_timing: bool = False):
+        """运行应用，show_timing 为 True 时在界面首次空闲后输出启动耗时"""
+        def on_ready():
+            STARTUP_TIMING['total'] = time.perf_counter() - _START
+            if show_timing:
+                print(report_startup_timing(), file=sys.stderr or sys.stdout)
+
+        self.window.after_idle(on_ready)
         self.window.mainloop()
 
 if __name__ == '__main__':
     try:
         app = ThermocoupleApp()
-        app.run()
+        app.run(show_timing='--timing' in sys.argv)
     except Exception as e:
+        load_tk()
         messagebox.showerror("错误", f"程序启动失败: {str(e)}")
\ No newline at end of file
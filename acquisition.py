@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""多通道并行采集转换
+
+每个通道绑定一种热电偶类型，一帧数据中的各通道分别提交到线程池或进程池
+批量转换。转换器使用不可变的 TypeConverter，线程之间无需加锁。
+
+用法示例 (测量不同工作线程/进程数下的加速比):
+    python acquisition.py --channels 32 --samples 200000 --executor both
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence
+
+from thermo_core import KTypeConverter, TypeConverter
+
+class Channel(NamedTuple):
+    """采集通道"""
+    name: str
+    type_name: str
+    cj_temp: Optional[float] = None  # 冷端温度，为 None 时不做冷端补偿
+
+def _convert_block(converter: TypeConverter, values, cj_temp: Optional[float]):
+    """转换一个通道的数据块"""
+    if cj_temp is None:
+        return converter.mv_to_temp_many(values)
+    return converter.mv_to_temp_cjc_many(values, cj_temp)
+
+# 子进程内的转换器，由 _init_worker 在进程启动时设置一次
+_worker_converters: Dict[str, TypeConverter] = {}
+
+def _init_worker(converters: Dict[str, TypeConverter]) -> None:
+    """进程池初始化: 每个子进程只接收一次转换器"""
+    global _worker_converters
+    _worker_converters = converters
+
+def _convert_block_in_worker(type_name: str, values, cj_temp: Optional[float]):
+    """子进程中按类型名转换，避免每个任务都 pickle 转换器"""
+    return _convert_block(_worker_converters[type_name], values, cj_temp)
+
+class AcquisitionEngine:
+    """多通道转换引擎
+
+    executor 为 'thread' (默认) 或 'process'，workers 为并发数，缺省为 CPU 核数。
+    线程池依赖 numpy 批量运算释放 GIL 获得并行度；进程池不受 GIL 限制，
+    但每帧数据需要在进程间传递。
+    """
+
+    def __init__(self, channels: Sequence[Channel], converter: Optional[KTypeConverter] = None,
+                 executor: str = 'thread', workers: Optional[int] = None):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"不支持的执行器: {executor}")
+        if converter is None:
+            converter = KTypeConverter()
+        self.channels: List[Channel] = list(channels)
+        self.converters: Dict[str, TypeConverter] = {
+            ch.type_name: converter.get_converter(ch.type_name) for ch in self.channels
+        }
+        self.executor_kind = executor
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Executor
+        if executor == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.converters,))
+
+    def convert(self, frame: Mapping[str, Sequence[float]]) -> Dict[str, object]:
+        """转换一帧数据: {通道名: 热电势序列} -> {通道名: 温度数组}"""
+        futures = {}
+        for ch in self.channels:
+            values = frame[ch.name]
+            if self.executor_kind == 'thread':
+                futures[ch.name] = self._executor.submit(
+                    _convert_block, self.converters[ch.type_name], values, ch.cj_temp)
+            else:
+                futures[ch.name] = self._executor.submit(
+                    _convert_block_in_worker, ch.type_name, values, ch.cj_temp)
+        return {name: future.result() for name, future in futures.items()}
+
+    def close(self) -> None:
+        """关闭线程池/进程池"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'AcquisitionEngine':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def make_channels(count: int, types: Sequence[str] = ('K', 'E', 'S')) -> List[Channel]:
+    """生成混合类型的测试通道"""
+    return [Channel(f"CH{i:03d}", types[i % len(types)], 25.0) for i in range(count)]
+
+def make_frame(converter: KTypeConverter, channels: Sequence[Channel], samples: int) -> Dict[str, object]:
+    """按各通道类型的热电势范围生成随机数据"""
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    frame = {}
+    for ch in channels:
+        mv_min, mv_max = converter.get_converter(ch.type_name).mv_bounds
+        if np is None:
+            frame[ch.name] = [random.uniform(mv_min, mv_max) for _ in range(samples)]
+        else:
+            frame[ch.name] = np.random.uniform(mv_min, mv_max, samples)
+    return frame
+
+def measure_scaling(channels: int = 32, samples: int = 100000, executors: Sequence[str] = ('thread',),
+                    worker_counts: Optional[Sequence[int]] = None, repeat: int = 3) -> List[Dict[str, float]]:
+    """测量不同并发数下的转换吞吐量和相对单工作者的加速比"""
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+    with contextlib.redirect_stdout(sys.stderr):
+        converter = KTypeConverter()
+    chans = make_channels(channels)
+    frame = make_frame(converter, chans, samples)
+    total = channels * samples
+
+    results = []
+    for kind in executors:
+        baseline = None
+        for workers in worker_counts:
+            with AcquisitionEngine(chans, converter, kind, workers) as engine:
+                engine.convert(frame)  # 预热，进程池在此启动子进程
+                best = float('inf')
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    engine.convert(frame)
+                    best = min(best, time.perf_counter() - start)
+            baseline = baseline or best
+            results.append({
+                'executor': kind,
+                'workers': workers,
+                'seconds': best,
+                'samples_per_sec': total / best,
+                'speedup': baseline / best,
+            })
+    return results
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口: 输出并发扩展性测量结果"""
+    parser = argparse.ArgumentParser(description="多通道并行转换扩展性测试")
+    parser.add_argument('--channels', type=int, default=32, help="通道数")
+    parser.add_argument('--samples', type=int, default=100000, help="每通道每帧采样点数")
+    parser.add_argument('--executor', choices=['thread', 'process', 'both'], default='both')
+    parser.add_argument('--workers', type=str, default=None, help="逗号分隔的并发数列表，如 1,2,4")
+    parser.add_argument('--repeat', type=int, default=3, help="每组重复次数，取最好成绩")
+    args = parser.parse_args(argv)
+
+    executors = ['thread', 'process'] if args.executor == 'both' else [args.executor]
+    worker_counts = [int(w) for w in args.workers.split(',')] if args.workers else None
+    results = measure_scaling(args.channels, args.samples, executors, worker_counts, args.repeat)
+
+    print(f"{'执行器':<8}{'并发数':>6}{'耗时(s)':>10}{'采样/秒':>16}{'加速比':>8}")
+    for r in results:
+        print(f"{r['executor']:<10}{r['workers']:>6}{r['seconds']:>12.4f}"
+              f"{r['samples_per_sec']:>18,.0f}{r['speedup']:>9.2f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""后台批量转换任务 (不依赖 tkinter)
+
+BatchJob 在工作线程中读取文件或粘贴的文本、分块批量转换，
+进度、结果和错误都放在对象属性上，由界面线程定时读取，工作线程从不直接操作界面。
+输入和结果用 array('d') 保存，百万行也只占十几 MB。
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import math
+import os
+import threading
+from array import array
+
+from te_stream import chunked, parse_float, read_rows
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Optional
+
+DIRECTIONS = ('mv2t', 't2mv')
+
+class BatchJob:
+    """一次批量转换
+
+    source 为文件路径，text 为粘贴的文本，二者给出其一；每行取第 column 列。
+    无法解析或超出范围的值记为 NaN。
+    """
+
+    def __init__(self, converter, direction: str = 'mv2t', source: Optional[str] = None,
+                 text: Optional[str] = None, column: int = 0, chunk_size: int = 20000):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"不支持的转换方向: {direction}")
+        if (source is None) == (text is None):
+            raise ValueError("需要指定文件或文本中的一个")
+        self.converter = converter  # TypeConverter
+        self.direction = direction
+        self.source = source
+        self.text = text
+        self.column = column
+        self.chunk_size = chunk_size
+        self.inputs = array('d')
+        self.results = array('d')
+        # 已转换行数，任务结束(完成、取消或出错)后 total 等于 done，之前为 None
+        self.done = 0
+        self.total: Optional[int] = None
+        # 已读取的输入位置和输入大小 (文件为字节数，文本为字符数)，用于计算进度
+        self.position = 0
+        self.size = 0
+        self.error: Optional[BaseException] = None
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def progress(self) -> float:
+        """读取进度 0~1"""
+        if self.total is not None:
+            return 1.0
+        return self.position / self.size if self.size else 0.0
+
+    def start(self) -> None:
+        """在工作线程中开始转换"""
+        if self._thread is not None:
+            raise RuntimeError("任务已启动")
+        self._thread = threading.Thread(target=self._run, name='batch-convert', daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """请求取消，当前块转换完成后停止，已转换的结果保留"""
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """等待工作线程结束"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _open(self):
+        """打开输入，返回 (文本流, 读取位置函数)"""
+        if self.source is not None:
+            raw = open(self.source, 'rb')
+            self.size = os.fstat(raw.fileno()).st_size
+            # 文本流迭代时不能 tell，按底层二进制文件的位置估算进度
+            return io.TextIOWrapper(raw, encoding='utf-8', errors='ignore', newline=''), raw.tell
+        stream = io.StringIO(self.text)
+        self.size = len(self.text)
+        return stream, stream.tell
+
+    def _run(self) -> None:
+        convert = (self.converter.mv_to_temp_many if self.direction == 'mv2t'
+                   else self.converter.temp_to_mv_many)
+        column = self.column
+        try:
+            stream, tell = self._open()
+            with stream:
+                for chunk in chunked(read_rows(stream), self.chunk_size):
+                    if self._cancel.is_set():
+                        return
+                    values = [parse_float(row[column]) if column < len(row) else math.nan for row in chunk]
+                    results = convert(values)
+                    # 先扩展结果再更新计数，界面按 done 读取时数据一定已经就绪
+                    self.inputs.extend(values)
+                    self.results.extend(results)
+                    self.done = len(self.results)
+                    self.position = tell()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.total = self.done
+
+    def rows(self, start: int, stop: int):
+        """返回 [start, stop) 行的 (输入, 结果)，供表格按需显示"""
+        stop = min(stop, self.done)
+        return list(zip(self.inputs[start:stop], self.results[start:stop]))
+
+    def export_csv(self, path: str, precision: int = 3,
+                   progress: Optional[Callable[[int], None]] = None) -> int:
+        """导出已转换的结果，返回写出的行数"""
+        header = ('热电势(mV)', '温度(°C)') if self.direction == 'mv2t' else ('温度(°C)', '热电势(mV)')
+        count = self.done
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for start in range(0, count, self.chunk_size):
+                stop = min(start + self.chunk_size, count)
+                writer.writerows(
+                    (_format(x, precision), _format(y, precision))
+                    for x, y in zip(self.inputs[start:stop], self.results[start:stop]))
+                if progress is not None:
+                    progress(stop)
+        return count
+
+def _format(value: float, precision: int) -> str:
+    """NaN 输出为空"""
+    return '' if math.isnan(value) else f"{value:.{precision}f}"
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""性能基准测试
+
+覆盖各转换引擎的单值/批量转换、分度表加载以及 student.db 的查询、插入和删除。
+结果写入 JSON 文件，并与保存的基线比较，耗时超过阈值的项目标记为性能回退。
+
+用法:
+    python bench.py                          运行并与 bench_baseline.json 比较
+    python bench.py --save-baseline          运行并保存为新的基线
+    python bench.py --rows 10000,100000      指定 student.db 的测试数据规模
+    python bench.py --quick                  缩短重复次数，快速检查
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import tablefile
+from compat import get_numpy
+from thermo_core import ENGINES, KTypeConverter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = 'bench_results.json'
+DEFAULT_BASELINE = 'bench_baseline.json'
+TYPES = ('K', 'E', 'S')
+BATCH_SIZE = 100000
+
+def measure(func: Callable[[], object], number: int = 1, repeat: int = 5) -> float:
+    """重复 repeat 轮、每轮调用 number 次，返回最快一轮的单次耗时(秒)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def quiet(func: Callable, *args, **kwargs):
+    """屏蔽被测函数的打印输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+def bench_conversions(repeat: int, scalar_calls: int) -> Dict[str, float]:
+    """各引擎、各类型的单值和批量转换"""
+    results = {}
+    for engine in ENGINES:
+        converter = quiet(KTypeConverter, engine=engine)
+        for type_name in TYPES:
+            conv = converter.get_converter(type_name)
+            temp_min, temp_max = conv.temp_bounds
+            mv_min, mv_max = conv.mv_bounds
+            temps = [random.uniform(temp_min, temp_max) for _ in range(scalar_calls)]
+            mvs = [random.uniform(mv_min, mv_max) for _ in range(scalar_calls)]
+
+            def scalar_t2mv():
+                for t in temps:
+                    conv.temp_to_mv(t)
+
+            def scalar_mv2t():
+                for mv in mvs:
+                    conv.mv_to_temp(mv)
+
+            prefix = f"convert.{engine}.{type_name}"
+            results[f"{prefix}.temp_to_mv"] = measure(scalar_t2mv, repeat=repeat) / scalar_calls
+            results[f"{prefix}.mv_to_temp"] = measure(scalar_mv2t, repeat=repeat) / scalar_calls
+
+            batch_temps = [random.uniform(temp_min, temp_max) for _ in range(BATCH_SIZE)]
+            batch_mvs = [random.uniform(mv_min, mv_max) for _ in range(BATCH_SIZE)]
+            np = get_numpy()
+            if np is not None:
+                batch_temps, batch_mvs = np.asarray(batch_temps), np.asarray(batch_mvs)
+            conv.temp_to_mv_many(batch_temps[:10])  # 预热: 导入 numpy、建立数组缓存
+            results[f"{prefix}.temp_to_mv_many"] = measure(
+                lambda: conv.temp_to_mv_many(batch_temps), repeat=repeat) / BATCH_SIZE
+            results[f"{prefix}.mv_to_temp_many"] = measure(
+                lambda: conv.mv_to_temp_many(batch_mvs), repeat=repeat) / BATCH_SIZE
+    return results
+
+def bench_loading(repeat: int, workdir: str) -> Dict[str, float]:
+    """分度表加载: 进程内 JSON/二进制加载，以及新进程冷启动"""
+    results = {
+        'load.json': measure(lambda: quiet(KTypeConverter), repeat=repeat),
+    }
+    binary = os.path.join(workdir, 'thermocouple_data.tctb')
+    with open(os.path.join(HERE, 'thermocouple_data.json'), 'r', encoding='utf-8', errors='ignore') as f:
+        tablefile.write_tables(json.load(f)['types'], binary)
+    results['load.tctb'] = measure(lambda: quiet(KTypeConverter, data_file=binary), repeat=repeat)
+
+    script = "import thermo_core; thermo_core.KTypeConverter()"
+    cmd = [sys.executable, '-c', script]
+    results['load.cold_start'] = measure(
+        lambda: subprocess.run(cmd, cwd=HERE, stdout=subprocess.DEVNULL, check=True), repeat=repeat)
+    return results
+
+def make_student_db(path: str, rows: int) -> None:
+    """生成指定行数的 student.db 测试库"""
+    from db import Database
+    from student_store import create_schema
+    database = Database(f'sqlite:///{path}')
+    create_schema(database.engine)
+    database.dispose()
+    conn = sqlite3.connect(path)
+    rnd = random.Random(rows)
+    conn.executemany(
+        'INSERT INTO student_scores (name, chinese, math, physics, chemistry) VALUES (?, ?, ?, ?, ?)',
+        ((f"学生{i}", rnd.randint(40, 100), rnd.randint(40, 100), rnd.randint(40, 100), rnd.randint(40, 100))
+         for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+@contextlib.contextmanager
+def sqdata_session(path: str):
+    """把 sqdata 的数据库临时绑定到测试库"""
+    import sqdata
+    from db import Database
+    original = sqdata.database
+    sqdata.database = Database(f'sqlite:///{path}')
+    try:
+        yield sqdata
+    finally:
+        sqdata.database.dispose()
+        sqdata.database = original
+
+@contextlib.contextmanager
+def scripted_input(module, answers: Sequence):
+    """用预设答案代替交互输入"""
+    original = module.get_valid_input
+    queue = list(answers)
+
+    def fake(prompt, validator=None):
+        value = queue.pop(0)
+        return validator(value) if validator else value
+
+    module.get_valid_input = fake
+    try:
+        yield
+    finally:
+        module.get_valid_input = original
+
+def bench_database(rows_list: Sequence[int], repeat: int, workdir: str) -> Dict[str, float]:
+    """sqdata.py 的 show_all / add_student / delete_student"""
+    results = {}
+    for rows in rows_list:
+        path = os.path.join(workdir, f'student_{rows}.db')
+        make_student_db(path, rows)
+        prefix = f"db.{rows}"
+        with sqdata_session(path) as sqdata:
+            results[f"{prefix}.show_all"] = measure(lambda: quiet(sqdata.show_all), repeat=repeat)
+
+            def insert():
+                with scripted_input(sqdata, ['基准', '90', '90', '90', '90']):
+                    quiet(sqdata.add_student)
+
+            results[f"{prefix}.insert"] = measure(insert, repeat=repeat)
+
+            def delete():
+                # 删除中间的一条记录，包含重新编号
+                with scripted_input(sqdata, [str(rows // 2)]):
+                    quiet(sqdata.delete_student)
+
+            results[f"{prefix}.delete"] = measure(delete, repeat=min(repeat, 3))
+    return results
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            threshold: float) -> List[Tuple[str, float, float, float]]:
+    """返回耗时比基线增加超过 threshold 的项目: (名称, 基线, 当前, 比值)"""
+    regressions = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if old and value / old > 1 + threshold:
+            regressions.append((name, old, value, value / old))
+    return regressions
+
+def format_seconds(seconds: float) -> str:
+    """按量级格式化耗时"""
+    for unit, scale in (('s', 1), ('ms', 1e3), ('µs', 1e6)):
+        if seconds * scale >= 1:
+            return f"{seconds * scale:8.2f} {unit}"
+    return f"{seconds * 1e9:8.1f} ns"
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="热电偶转换与数据库性能基准测试")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="结果文件 (JSON)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线文件 (JSON)")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--threshold', type=float, default=0.2, help="回退阈值，默认 0.2 即慢 20%%")
+    parser.add_argument('--rows', default='10000', help="student.db 测试行数，逗号分隔，如 10000,100000,1000000")
+    parser.add_argument('--only', choices=['convert', 'load', 'db'], action='append',
+                        help="只运行指定类别，可重复")
+    parser.add_argument('--quick', action='store_true', help="减少重复次数")
+    args = parser.parse_args(argv)
+
+    repeat = 2 if args.quick else 5
+    scalar_calls = 2000 if args.quick else 20000
+    groups = args.only or ['convert', 'load', 'db']
+    random.seed(0)
+
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        if 'convert' in groups:
+            results.update(bench_conversions(repeat, scalar_calls))
+        if 'load' in groups:
+            results.update(bench_loading(repeat, workdir))
+        if 'db' in groups:
+            rows_list = [int(r) for r in args.rows.split(',') if r]
+            results.update(bench_database(rows_list, repeat, workdir))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+
+    print(f"{'项目':<40}{'耗时':>12}{'基线':>12}{'比值':>8}")
+    for name, value in results.items():
+        old = baseline.get(name)
+        ratio = f"{value / old:7.2f}" if old else "      -"
+        old_text = format_seconds(old) if old else "           -"
+        print(f"{name:<42}{format_seconds(value)}{old_text:>14}{ratio:>8}")
+
+    document = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'unit': 'seconds per operation',
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+        print(f"已保存基线 {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n性能回退 ({len(regressions)} 项，阈值 {args.threshold:.0%}):")
+        for name, old, value, ratio in regressions:
+            print(f"  {name}: {format_seconds(old).strip()} -> {format_seconds(value).strip()} (x{ratio:.2f})")
+        return 1
+    if baseline:
+        print("未发现性能回退")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""可选依赖的延迟导入
+
+numpy 导入需要约 100ms，只在第一次批量运算时导入，
+避免只做单值转换的脚本和界面为它付出启动时间。
+"""
+
+_numpy = None
+_numpy_checked = False
+
+def get_numpy():
+    """返回 numpy 模块，未安装时返回 None"""
+    global _numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy, _numpy_checked = numpy, True
+    return _numpy
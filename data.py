@@ -1,42 +1,29 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from sqlalchemy import create_engine, Column, Integer, String
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import text
 import sys
+from db import Database
+from student_store import create_schema, create_student, fetch_page, remove_students, summarize, validate_score
 
-# 创建基类
-Base = declarative_base()
+# 显示记录时每页的条数
+PAGE_SIZE = 20
 
-class StudentScore(Base):
-    """学生成绩表"""
-    __tablename__ = 'student_scores'
-    
-    id = Column(Integer, primary_key=True, comment='编号')
-    name = Column(String(20), nullable=False, comment='姓名')
-    chinese = Column(Integer, comment='语文')
-    math = Column(Integer, comment='数学')
-    physics = Column(Integer, comment='物理')
-    chemistry = Column(Integer, comment='化学')
-
-    def __repr__(self):
-        return f"<Student {self.name}>"
-
-    @property
-    def average(self):
-        """计算平均分"""
-        scores = [self.chinese, self.math, self.physics, self.chemistry]
-        return sum(scores) / len(scores)
+def iter_pages(database, page_size: int = PAGE_SIZE, after_id: int = 0):
+    """按ID键集分页逐页读取 (id, 姓名, 四科成绩, 平均分) 行，整个遍历在一个读事务中"""
+    with database.read_session() as session:
+        while True:
+            rows = fetch_page(session, page_size, after_id)
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1].id
 
-def validate_score(score_str: str) -> int:
-    """验证分数输入"""
-    try:
-        score = int(score_str)
-        if 0 <= score <= 100:
-            return score
-        raise ValueError("分数必须在0-100之间")
-    except ValueError:
-        raise ValueError("请输入有效的分数")
+def class_summary(database):
+    """聚合查询: (人数, 班级平均分, 优秀人数, 良好人数)"""
+    with database.read_session() as session:
+        summary = summarize(session)
+    return summary['count'], summary['average'], summary['grades']['优秀'], summary['grades']['良好']
 
 def get_valid_input(prompt: str, validator=None) -> str:
     """获取并验证用户输入"""
@@ -49,7 +36,7 @@ def get_valid_input(prompt: str, validator=None) -> str:
         except ValueError as e:
             print(f"输入错误: {e}")
 
-def add_student(session):
+def add_student(database):
     """添加新学生记录"""
     try:
         name = get_valid_input("姓名：")
@@ -62,75 +49,71 @@ def add_student(session):
         physics = get_valid_input("物理分数：", validate_score)
         chemistry = get_valid_input("化学分数：", validate_score)
         
-        new_student = StudentScore(
-            name=name,
-            chinese=chinese,
-            math=math,
-            physics=physics,
-            chemistry=chemistry
-        )
-        session.add(new_student)
-        session.commit()
+        with database.write_session() as session:
+            create_student(session, name, chinese, math, physics, chemistry)
         print("添加成功！")
     except Exception as e:
         print(f"添加失败: {e}")
-        session.rollback()
 
-def show_all(session):
-    """显示所有学生记录"""
+def show_all(database, page_size=None):
+    """显示所有学生记录
+
+    按页流式读取输出；page_size 不为 None 时每页之后暂停，输入 q 结束浏览。
+    """
     try:
-        students = session.query(StudentScore).order_by(StudentScore.id).all()
-        if not students:
+        header = "  ID    姓名     语文  数学  物理  化学  平均分"
+        shown = 0
+        for page in iter_pages(database, page_size or 1000):
+            if shown == 0:
+                print("\n当前所有学生成绩：")
+                print(header)
+                print("-" * len(header))
+            for s in page:
+                print("{:^5} {:^8} {:^5} {:^5} {:^5} {:^5} {:^6.1f}".format(
+                    s.id, s.name, s.chinese, s.math, s.physics, s.chemistry, s.average))
+            shown += len(page)
+            if page_size is not None and len(page) == page_size:
+                if input(f"-- 已显示 {shown} 条，回车继续，q 结束 --").strip().lower() == 'q':
+                    break
+        if shown == 0:
             print("\n暂无学生记录")
             return
-            
-        print("\n当前所有学生成绩：")
-        header = "  ID    姓名     语文  数学  物理  化学  平均分"
-        print(header)
-        print("-" * len(header))
-        
-        for s in students:
-            print("{:^5} {:^8} {:^5} {:^5} {:^5} {:^5} {:^6.1f}".format(
-                s.id, s.name, s.chinese, s.math, s.physics, s.chemistry, s.average))
                 
         print("-" * len(header))
+        total, total_avg, excellent, good = class_summary(database)
+        print(f"共 {total} 人, 班级平均分: {total_avg:.1f}, 优秀(★) {excellent} 人, 良好(☆) {good} 人")
             
     except Exception as e:
         print(f"查询失败: {e}")
 
 def reset_sequence(session):
-    """重置主键序列"""
-    try:
-        session.execute("UPDATE sqlite_sequence SET seq = (SELECT MAX(id) FROM student_scores) WHERE name = 'student_scores'")
-        session.commit()
-    except Exception as e:
-        print(f"重置序列失败: {e}")
-        session.rollback()
+    """重置主键序列 (不提交)，表没有自增序列时不做任何事"""
+    has_sequence = session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_sequence'")).first()
+    if has_sequence:
+        session.execute(text("UPDATE sqlite_sequence SET seq = (SELECT MAX(id) FROM student_scores) WHERE name = 'student_scores'"))
 
-def delete_student(session):
+def delete_student(database):
     """删除学生记录"""
     try:
         student_id = get_valid_input("请输入要删除的学生ID：", int)
-        student = session.query(StudentScore).get(student_id)
-        if student:
-            session.delete(student)
-            session.commit()
-            # 只重置序列，不修改现有记录
-            reset_sequence(session)
+        with database.write_session() as session:
+            deleted = remove_students(session, [student_id])
+            if deleted:
+                # 只重置序列，不修改现有记录；与删除在同一个事务中
+                reset_sequence(session)
+        if deleted:
             print(f"已删除ID为 {student_id} 的学生")
         else:
             print("未找到该学生")
     except Exception as e:
         print(f"删除失败: {e}")
-        session.rollback()
 
 def main():
     """主程序"""
-    # 初始化数据库连接
-    engine = create_engine('sqlite:///student.db', echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    # 初始化数据库连接 (连接池、WAL、busy_timeout 见 db.Database)
+    database = Database('sqlite:///student.db')
+    create_schema(database.engine)
 
     try:
         while True:
@@ -144,11 +127,11 @@ def main():
                 choice = input("\n请选择操作(1-4): ").strip()
                 
                 if choice == '1':
-                    show_all(session)
+                    show_all(database, PAGE_SIZE)
                 elif choice == '2':
-                    add_student(session)
+                    add_student(database)
                 elif choice == '3':
-                    delete_student(session)
+                    delete_student(database)
                 elif choice == '4':
                     raise KeyboardInterrupt  # 触发退出
                 else:
@@ -163,11 +146,14 @@ def main():
         print("\n正在退出程序...")
     finally:
         print("正在关闭数据库连接...")
-        session.close()
+        database.dispose()
         print("程序已退出！")
         sys.exit(0)
 
 if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        if arg.startswith('--page-size='):
+            PAGE_SIZE = max(1, int(arg.split('=', 1)[1]))
     try:
         main()
     except Exception as e:
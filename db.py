@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""共享数据库层
+
+统一创建 SQLite 引擎: 连接池、WAL 日志、busy_timeout 和同步级别，
+并按操作提供会话:
+    with database.read_session() as s:   只读事务 (延迟事务，WAL 下不阻塞也不被写入阻塞)
+    with database.write_session() as s:  写事务，成功时提交，异常时回滚
+
+写事务以 BEGIN IMMEDIATE 开始，一开始就取得写锁，避免读事务中途升级为写事务时
+被其他写入者抢先而直接报 "database is locked"；同一进程内的写入者再用一把锁排队，
+跨进程的写入者由 busy_timeout 等待。
+
+AsyncDatabase 是 asyncio 版本 (SQLAlchemy asyncio 扩展 + aiosqlite 驱动)，
+连接设置与事务方式相同，会话为 AsyncSession，写入者用 asyncio.Lock 排队。
+
+并发压力测试:
+    python db.py --writers 8 --readers 8 --seconds 5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, Optional, Sequence
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_URL = 'sqlite:///student.db'
+DEFAULT_ASYNC_URL = 'sqlite+aiosqlite:///student.db'
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+class _SQLiteSettings:
+    """同步和异步引擎共用的连接设置"""
+
+    def _configure(self, url: str, busy_timeout: int, synchronous: str, journal_mode: str) -> dict:
+        """检查并保存设置，返回 create_engine 的 connect_args"""
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"不支持的同步级别: {synchronous}")
+        self.url = url
+        self.busy_timeout = busy_timeout
+        self.synchronous = synchronous
+        self.journal_mode = journal_mode
+        return {'check_same_thread': False, 'timeout': busy_timeout / 1000}
+
+    def _listen(self, engine) -> None:
+        """在 (同步) 引擎上注册连接和事务事件"""
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'begin', self._on_begin)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        """新连接: 设置 pragma，并关闭驱动自带的事务管理，改由 _on_begin 显式开始事务"""
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        cursor.execute(f'PRAGMA synchronous={self.synchronous}')
+        cursor.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        cursor.close()
+
+    @staticmethod
+    def _on_begin(conn) -> None:
+        """按执行选项开始延迟事务或立即事务"""
+        mode = conn.get_execution_options().get('sqlite_begin')
+        conn.exec_driver_sql('BEGIN IMMEDIATE' if mode == 'IMMEDIATE' else 'BEGIN')
+
+class Database(_SQLiteSettings):
+    """SQLite 引擎和会话工厂
+
+    synchronous 在 WAL 模式下取 NORMAL 即可保证数据库不损坏，掉电时最多丢失最后的事务，
+    提交时不再每次 fsync；需要每次提交都落盘时取 FULL。
+    """
+
+    def __init__(self, url: str = DEFAULT_URL, pool_size: int = 5, max_overflow: int = 10,
+                 busy_timeout: int = 5000, synchronous: str = 'NORMAL', journal_mode: str = 'WAL',
+                 echo: bool = False):
+        connect_args = self._configure(url, busy_timeout, synchronous, journal_mode)
+        self.engine = create_engine(
+            url, echo=echo, pool_size=pool_size, max_overflow=max_overflow, connect_args=connect_args)
+        self._listen(self.engine)
+        # 写引擎与读引擎共用连接池，只是事务开始方式不同
+        self.write_engine = self.engine.execution_options(sqlite_begin='IMMEDIATE')
+        self._read_factory = sessionmaker(bind=self.engine)
+        self._write_factory = sessionmaker(bind=self.write_engine)
+        self._write_lock = threading.RLock()
+
+    @contextlib.contextmanager
+    def read_session(self) -> Iterator[Session]:
+        """只读会话，结束时回滚并归还连接"""
+        session = self._read_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    @contextlib.contextmanager
+    def write_session(self) -> Iterator[Session]:
+        """写会话: 进程内串行，正常结束时提交，异常时回滚"""
+        with self._write_lock:
+            session = self._write_factory()
+            try:
+                yield session
+                session.commit()
+            except BaseException:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+    def dispose(self) -> None:
+        """关闭连接池"""
+        self.engine.dispose()
+
+class AsyncDatabase(_SQLiteSettings):
+    """asyncio 版本的引擎和会话工厂，url 使用 sqlite+aiosqlite 驱动
+
+    aiosqlite 在后台线程中执行 SQLite 调用，查询期间事件循环可以继续处理其他请求。
+    """
+
+    def __init__(self, url: str = DEFAULT_ASYNC_URL, pool_size: int = 5, max_overflow: int = 10,
+                 busy_timeout: int = 5000, synchronous: str = 'NORMAL', journal_mode: str = 'WAL',
+                 echo: bool = False):
+        # 延迟导入: 只有使用异步接口时才需要 aiosqlite 和 greenlet
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        connect_args = self._configure(url, busy_timeout, synchronous, journal_mode)
+        self.engine = create_async_engine(
+            url, echo=echo, pool_size=pool_size, max_overflow=max_overflow, connect_args=connect_args)
+        self._listen(self.engine.sync_engine)
+        self.write_engine = self.engine.execution_options(sqlite_begin='IMMEDIATE')
+        # 异步会话提交后不能再隐式加载属性，因此提交时不让对象过期
+        self._read_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._write_factory = async_sessionmaker(bind=self.write_engine, expire_on_commit=False)
+        self._write_lock = asyncio.Lock()
+
+    @contextlib.asynccontextmanager
+    async def read_session(self) -> AsyncIterator['AsyncSession']:
+        """只读会话，结束时回滚并归还连接"""
+        async with self._read_factory() as session:
+            yield session
+
+    @contextlib.asynccontextmanager
+    async def write_session(self) -> AsyncIterator['AsyncSession']:
+        """写会话: 协程间串行，正常结束时提交，异常时回滚"""
+        async with self._write_lock:
+            async with self._write_factory() as session:
+                try:
+                    yield session
+                    await session.commit()
+                except BaseException:
+                    await session.rollback()
+                    raise
+
+    async def dispose(self) -> None:
+        """关闭连接池"""
+        await self.engine.dispose()
+
+def stress(path: str, writers: int = 8, readers: int = 8, seconds: float = 5.0) -> Dict[str, float]:
+    """多线程同时读写，返回各类操作次数和出错次数"""
+    database = Database(f'sqlite:///{path}', pool_size=writers + readers)
+    with database.write_session() as s:
+        s.execute(text('CREATE TABLE IF NOT EXISTS stress (id INTEGER PRIMARY KEY, worker INTEGER, value REAL)'))
+    counts = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def write_loop(worker: int) -> None:
+        while time.perf_counter() < deadline:
+            try:
+                with database.write_session() as s:
+                    # 先读后写，普通延迟事务在此处最容易因锁升级失败
+                    s.execute(text('SELECT count(*) FROM stress WHERE worker = :w'), {'w': worker}).scalar()
+                    s.execute(text('INSERT INTO stress (worker, value) VALUES (:w, :v)'),
+                              {'w': worker, 'v': random.random()})
+                key = 'writes'
+            except Exception:
+                key = 'errors'
+            with lock:
+                counts[key] += 1
+
+    def read_loop() -> None:
+        while time.perf_counter() < deadline:
+            try:
+                with database.read_session() as s:
+                    s.execute(text('SELECT max(id), avg(value) FROM stress')).one()
+                key = 'reads'
+            except Exception:
+                key = 'errors'
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=write_loop, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=read_loop) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    database.dispose()
+    result: Dict[str, float] = dict(counts)
+    result['writes_per_sec'] = counts['writes'] / seconds
+    result['reads_per_sec'] = counts['reads'] / seconds
+    return result
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口: 并发读写压力测试"""
+    parser = argparse.ArgumentParser(description="SQLite 并发读写压力测试")
+    parser.add_argument('--db', default=None, help="数据库文件，缺省使用临时文件")
+    parser.add_argument('--writers', type=int, default=8, help="写线程数")
+    parser.add_argument('--readers', type=int, default=8, help="读线程数")
+    parser.add_argument('--seconds', type=float, default=5.0, help="测试时长(秒)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.db or os.path.join(workdir, 'stress.db')
+        result = stress(path, args.writers, args.readers, args.seconds)
+    print(f"写入 {result['writes']} 次 ({result['writes_per_sec']:,.0f}/秒), "
+          f"读取 {result['reads']} 次 ({result['reads_per_sec']:,.0f}/秒), 错误 {result['errors']} 次")
+    return 1 if result['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""NIST ITS-90 热电偶参考函数及反函数多项式 (K/E/S 型)"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_right
+
+from compat import get_numpy
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Sequence, Tuple
+
+    # 每个分段: (下限, 上限, 多项式系数 c0..cn)，自变量分别为 °C 和 mV
+    Segment = Tuple[float, float, Sequence[float]]
+
+ITS90_COEFFICIENTS: Dict[str, Dict] = {
+    'K': {
+        'forward': [
+            (-270.0, 0.0, (
+                0.000000000000E+00, 0.394501280250E-01, 0.236223735980E-04,
+                -0.328589067840E-06, -0.499048287770E-08, -0.675090591730E-10,
+                -0.574103274280E-12, -0.310888728940E-14, -0.104516093650E-16,
+                -0.198892668780E-19, -0.163226974860E-22)),
+            (0.0, 1372.0, (
+                -0.176004136860E-01, 0.389212049750E-01, 0.185587700320E-04,
+                -0.994575928740E-07, 0.318409457190E-09, -0.560728448890E-12,
+                0.560750590590E-15, -0.320207200030E-18, 0.971511471520E-22,
+                -0.121047212750E-25)),
+        ],
+        # K 型 0°C 以上附加指数项: a0 * exp(a1 * (t - a2)^2)
+        'exponential': (0.118597600000E+00, -0.118343200000E-03, 0.126968600000E+03),
+        'inverse': [
+            (-5.891, 0.0, (
+                0.0, 2.5173462E+01, -1.1662878E+00, -1.0833638E+00, -8.9773540E-01,
+                -3.7342377E-01, -8.6632643E-02, -1.0450598E-02, -5.1920577E-04)),
+            (0.0, 20.644, (
+                0.0, 2.508355E+01, 7.860106E-02, -2.503131E-01, 8.315270E-02,
+                -1.228034E-02, 9.804036E-04, -4.413030E-05, 1.057734E-06,
+                -1.052755E-08)),
+            (20.644, 54.886, (
+                -1.318058E+02, 4.830222E+01, -1.646031E+00, 5.464731E-02,
+                -9.650715E-04, 8.802193E-06, -3.110810E-08)),
+        ],
+    },
+    'E': {
+        'forward': [
+            (-270.0, 0.0, (
+                0.000000000000E+00, 0.586655087080E-01, 0.454109771240E-04,
+                -0.779980486860E-06, -0.258001608430E-07, -0.594525830570E-09,
+                -0.932140586670E-11, -0.102876055340E-12, -0.803701236210E-15,
+                -0.439794973910E-17, -0.164147763550E-19, -0.396736195160E-22,
+                -0.558273287210E-25, -0.346578420130E-28)),
+            (0.0, 1000.0, (
+                0.000000000000E+00, 0.586655087100E-01, 0.450322755820E-04,
+                0.289084072120E-07, -0.330568966520E-09, 0.650244032700E-12,
+                -0.191974955040E-15, -0.125366004970E-17, 0.214892175690E-20,
+                -0.143880417820E-23, 0.359608994810E-27)),
+        ],
+        'inverse': [
+            (-8.825, 0.0, (
+                0.0, 1.6977288E+01, -4.3514970E-01, -1.5859697E-01, -9.2502871E-02,
+                -2.6084314E-02, -4.1360199E-03, -3.4034030E-04, -1.1564890E-05)),
+            (0.0, 76.373, (
+                0.0, 1.7057035E+01, -2.3301759E-01, 6.5435585E-03, -7.3562749E-05,
+                -1.7896001E-06, 8.4036165E-08, -1.3735879E-09, 1.0629823E-11,
+                -3.2447087E-14)),
+        ],
+    },
+    'S': {
+        'forward': [
+            (-50.0, 1064.18, (
+                0.000000000000E+00, 0.540313308631E-02, 0.125934289740E-04,
+                -0.232477968689E-07, 0.322028823036E-10, -0.331465196389E-13,
+                0.255744251786E-16, -0.125068871393E-19, 0.271443176145E-23)),
+            (1064.18, 1664.5, (
+                0.132900444085E+01, 0.334509311344E-02, 0.654805192818E-05,
+                -0.164856259209E-08, 0.129989605174E-13)),
+            (1664.5, 1768.1, (
+                0.146628232636E+03, -0.258430516752E+00, 0.163693574641E-03,
+                -0.330439046987E-07, -0.943223690612E-14)),
+        ],
+        'inverse': [
+            (-0.235, 1.874, (
+                0.0, 1.84949460E+02, -8.00504062E+01, 1.02237430E+02,
+                -1.52248592E+02, 1.88821343E+02, -1.59085941E+02, 8.23027880E+01,
+                -2.34181944E+01, 2.79786260E+00)),
+            (1.874, 10.332, (
+                1.291507177E+01, 1.466298863E+02, -1.534713402E+01, 3.145945973E+00,
+                -4.163257839E-01, 3.187963771E-02, -1.291637500E-03, 2.183475087E-05,
+                -1.447379511E-07, 8.211272125E-09)),
+            (10.332, 17.536, (
+                -8.087801117E+01, 1.621573104E+02, -8.536869453E+00, 4.719686976E-01,
+                -1.441693666E-02, 2.081618890E-04)),
+            (17.536, 18.693, (
+                5.333875126E+04, -1.235892298E+04, 1.092657613E+03, -4.265693686E+01,
+                6.247205420E-01)),
+        ],
+    },
+}
+
+class PolynomialTable:
+    """分段多项式求值 (Horner 法)
+
+    只按分段边界二分选择多项式，每次调用的计算量与分度表点数无关。
+    首末两段向外延伸，范围检查由调用方负责。
+    """
+    __slots__ = ('breaks', 'coeffs', 'exponential')
+
+    def __init__(self, segments: List[Segment], exponential: Optional[Tuple[float, float, float]] = None):
+        segments = sorted(segments, key=lambda s: s[0])
+        self.breaks: List[float] = [seg[0] for seg in segments[1:]]
+        # 系数按高次到低次保存，便于 Horner 循环
+        self.coeffs: List[Tuple[float, ...]] = [tuple(reversed(seg[2])) for seg in segments]
+        self.exponential = exponential
+
+    def lookup(self, x: float) -> Optional[float]:
+        """计算 x 处的多项式值"""
+        y = 0.0
+        for c in self.coeffs[bisect_right(self.breaks, x)]:
+            y = y * x + c
+        if self.exponential is not None and x > 0:
+            a0, a1, a2 = self.exponential
+            y += a0 * math.exp(a1 * (x - a2) ** 2)
+        return y
+
+    def lookup_many(self, values):
+        """批量求值，有 numpy 时按分段整体做 Horner 运算"""
+        np = get_numpy()
+        if np is None:
+            return [self.lookup(x) for x in values]
+
+        x = np.asarray(values, dtype=float)
+        index = np.searchsorted(self.breaks, x, side='right')
+        y = np.zeros_like(x)
+        for i, coeffs in enumerate(self.coeffs):
+            sel = index == i
+            if not sel.any():
+                continue
+            xi = x[sel]
+            yi = np.zeros_like(xi)
+            for c in coeffs:
+                yi = yi * xi + c
+            y[sel] = yi
+        if self.exponential is not None:
+            a0, a1, a2 = self.exponential
+            pos = x > 0
+            y[pos] += a0 * np.exp(a1 * (x[pos] - a2) ** 2)
+        return y
+
+def build_tables(type_name: str, info: Dict = None) -> Tuple[PolynomialTable, PolynomialTable]:
+    """构建指定类型的正向(温度→热电势)和反向(热电势→温度)多项式"""
+    if type_name not in ITS90_COEFFICIENTS:
+        raise ValueError(f"ITS-90 多项式不支持类型: {type_name}")
+    coeffs = ITS90_COEFFICIENTS[type_name]
+    return (PolynomialTable(coeffs['forward'], coeffs.get('exponential')),
+            PolynomialTable(coeffs['inverse']))
@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Modbus/TCP 热电偶采集服务 (asyncio)
+
+从多台 PLC 的保持寄存器轮询热电势原始值，转换为温度后发布。
+每个通道占两个寄存器，按大端 float32 存放热电势(mV)。
+同一连接上的请求按事务号流水线发送，并用信号量限制每台设备的在途请求数。
+
+自带模拟 PLC，可在单机上启动数百台设备做压力测试:
+    python modbus_service.py --devices 200 --channels 16 --interval 0.1 --duration 10
+"""
+
+import argparse
+import asyncio
+import contextlib
+import math
+import random
+import struct
+import sys
+import time
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from thermo_core import KTypeConverter, TypeConverter
+
+READ_HOLDING_REGISTERS = 0x03
+MAX_REGISTERS = 125  # 单次读取的寄存器数量上限 (Modbus 协议规定)
+REGISTERS_PER_CHANNEL = 2
+
+# MBAP 报文头: 事务号, 协议号(恒为0), 后续长度, 单元号
+MBAP_HEADER = struct.Struct('>HHHB')
+
+class ModbusError(RuntimeError):
+    """设备返回的 Modbus 异常响应"""
+
+    def __init__(self, function: int, code: int):
+        super().__init__(f"Modbus 异常响应: 功能码 {function:#04x}, 异常码 {code}")
+        self.function = function
+        self.code = code
+
+class ModbusClient:
+    """流水线 Modbus/TCP 客户端
+
+    请求发出后不等待响应即可发送下一个，由后台读取任务按事务号分发响应；
+    max_inflight 限制同一连接上同时在途的请求数。
+    """
+
+    def __init__(self, host: str, port: int, unit: int = 1, max_inflight: int = 4, timeout: float = 1.0):
+        self.host = host
+        self.port = port
+        self.unit = unit
+        self.timeout = timeout
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_tid = 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._read_task is not None and not self._read_task.done()
+
+    async def connect(self) -> None:
+        """建立连接并启动响应读取任务"""
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._read_task = asyncio.ensure_future(self._read_loop())
+
+    async def close(self) -> None:
+        """关闭连接，未完成的请求以 ConnectionError 结束"""
+        if self._read_task is not None:
+            self._read_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._read_task
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            with contextlib.suppress(ConnectionError):
+                await self._writer.wait_closed()
+            self._writer = None
+        self._fail_pending(ConnectionError("连接已关闭"))
+
+    async def read_holding_registers(self, address: int, count: int) -> bytes:
+        """读取保持寄存器，返回寄存器原始字节 (每个寄存器2字节，大端)"""
+        if not 1 <= count <= MAX_REGISTERS:
+            raise ValueError(f"寄存器数量必须在 1~{MAX_REGISTERS} 之间")
+        if not self.connected:
+            raise ConnectionError("未连接到设备")
+        async with self._inflight:
+            tid = self._next_tid
+            self._next_tid = (tid + 1) & 0xFFFF
+            future = asyncio.get_running_loop().create_future()
+            self._pending[tid] = future
+            try:
+                pdu = struct.pack('>BHH', READ_HOLDING_REGISTERS, address, count)
+                self._writer.write(MBAP_HEADER.pack(tid, 0, len(pdu) + 1, self.unit) + pdu)
+                await self._writer.drain()
+                data = await asyncio.wait_for(future, self.timeout)
+            finally:
+                self._pending.pop(tid, None)
+        if len(data) != 2 * count:
+            raise ConnectionError(f"响应长度错误: 请求 {count} 个寄存器, 收到 {len(data)} 字节")
+        return data
+
+    async def _read_loop(self) -> None:
+        """按事务号把响应分发给等待中的请求"""
+        try:
+            while True:
+                header = await self._reader.readexactly(MBAP_HEADER.size)
+                tid, _, length, _ = MBAP_HEADER.unpack(header)
+                if length < 2:
+                    raise ConnectionError(f"MBAP 长度字段错误: {length}")
+                pdu = await self._reader.readexactly(length - 1)
+                future = self._pending.get(tid)
+                if future is None or future.done():
+                    continue  # 已超时的请求，丢弃迟到的响应
+                if len(pdu) < 2:
+                    future.set_exception(ConnectionError("响应报文不完整"))
+                elif pdu[0] & 0x80:
+                    future.set_exception(ModbusError(pdu[0] & 0x7F, pdu[1]))
+                else:
+                    future.set_result(pdu[2:2 + pdu[1]])
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            self._fail_pending(ConnectionError(f"连接中断: {e}"))
+
+    def _fail_pending(self, error: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+class Device(NamedTuple):
+    """被轮询的 PLC 设备，types 按通道顺序给出热电偶类型"""
+    name: str
+    host: str
+    port: int
+    types: Sequence[str]
+    unit: int = 1
+    address: int = 0
+
+class PollService:
+    """轮询多台设备并发布转换后的温度
+
+    publish(设备名, 时间戳, {通道序号: 温度}) 在每个轮询周期完成后调用，
+    超出范围的通道值为 NaN。
+    """
+
+    def __init__(self, devices: Sequence[Device], converter: Optional[KTypeConverter] = None,
+                 interval: float = 1.0, max_inflight: int = 4, timeout: float = 1.0,
+                 publish: Optional[Callable[[str, float, Dict[int, float]], None]] = None):
+        if converter is None:
+            converter = KTypeConverter()
+        self.devices = list(devices)
+        self.converter = converter
+        self.interval = interval
+        self.max_inflight = max_inflight
+        self.timeout = timeout
+        self.publish = publish
+        self.latencies: deque = deque(maxlen=100000)
+        self.polls = 0
+        self.readings = 0
+        self.errors = 0
+        self._started = 0.0
+        self._stopped = 0.0
+
+    async def run(self, duration: Optional[float] = None) -> None:
+        """开始轮询，duration 为 None 时一直运行直到被取消"""
+        self._started = time.perf_counter()
+        tasks = [asyncio.ensure_future(self._poll_device(device)) for device in self.devices]
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._stopped = time.perf_counter()
+
+    async def _poll_device(self, device: Device) -> None:
+        """单台设备的轮询循环，断线后自动重连"""
+        loop = asyncio.get_running_loop()
+        channel_count = len(device.types)
+        # 按寄存器上限分块，各块在同一连接上流水线发送
+        per_block = MAX_REGISTERS // REGISTERS_PER_CHANNEL
+        blocks = [(device.address + start * REGISTERS_PER_CHANNEL,
+                   min(per_block, channel_count - start) * REGISTERS_PER_CHANNEL)
+                  for start in range(0, channel_count, per_block)]
+        groups: Dict[str, List[int]] = {}
+        for index, type_name in enumerate(device.types):
+            groups.setdefault(type_name, []).append(index)
+        converters: Dict[str, TypeConverter] = {t: self.converter.get_converter(t) for t in groups}
+
+        client = ModbusClient(device.host, device.port, device.unit, self.max_inflight, self.timeout)
+        next_tick = loop.time()
+        try:
+            while True:
+                try:
+                    if not client.connected:
+                        await client.connect()
+                    start = loop.time()
+                    chunks = await asyncio.gather(
+                        *(client.read_holding_registers(address, count) for address, count in blocks))
+                    latency = loop.time() - start
+
+                    mvs = struct.unpack(f'>{channel_count}f', b''.join(chunks))
+                    values: Dict[int, float] = {}
+                    for type_name, indexes in groups.items():
+                        temps = converters[type_name].mv_to_temp_many([mvs[i] for i in indexes])
+                        values.update(zip(indexes, (float(t) for t in temps)))
+                    self.latencies.append(latency)
+                    self.polls += 1
+                    self.readings += channel_count
+                    if self.publish is not None:
+                        self.publish(device.name, time.time(), values)
+                except Exception:
+                    # 通信错误、异常响应、报文解码失败和 publish 回调出错都只计数并重连，
+                    # 不让单台设备的任务退出 (退出会使 run() 取消其他设备)
+                    self.errors += 1
+                    await client.close()
+                    await asyncio.sleep(self.interval)
+                    next_tick = loop.time()
+                    continue
+
+                next_tick += self.interval
+                delay = next_tick - loop.time()
+                if delay < 0:
+                    next_tick = loop.time()  # 落后时不补发，直接进入下一周期
+                    delay = 0
+                await asyncio.sleep(delay)
+        finally:
+            await client.close()
+
+    def report(self) -> Dict[str, float]:
+        """轮询延迟分位数 (毫秒) 和吞吐量"""
+        elapsed = (self._stopped or time.perf_counter()) - self._started
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return math.nan
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+        return {
+            'devices': len(self.devices),
+            'polls': self.polls,
+            'readings': self.readings,
+            'errors': self.errors,
+            'elapsed': elapsed,
+            'polls_per_sec': self.polls / elapsed if elapsed > 0 else 0.0,
+            'readings_per_sec': self.readings / elapsed if elapsed > 0 else 0.0,
+            'latency_p50_ms': percentile(0.50),
+            'latency_p95_ms': percentile(0.95),
+            'latency_p99_ms': percentile(0.99),
+            'latency_max_ms': ordered[-1] * 1000 if ordered else math.nan,
+        }
+
+class SimulatedPLC:
+    """模拟 PLC: 在本机端口上提供保持寄存器读取
+
+    每个通道的温度围绕设定值缓慢正弦波动，按通道类型转换为热电势后
+    写入寄存器；寄存器内容由 update 周期性刷新，请求处理只做切片。
+    """
+
+    def __init__(self, types: Sequence[str], converter: KTypeConverter, host: str = '127.0.0.1', port: int = 0):
+        self.types = list(types)
+        self.host = host
+        self.port = port
+        self._converters = [converter.get_converter(t) for t in self.types]
+        self._setpoints = []
+        for conv in self._converters:
+            low, high = conv.temp_bounds
+            self._setpoints.append(random.uniform(low + 0.2 * (high - low), high - 0.2 * (high - low)))
+        self._phase = random.uniform(0, 2 * math.pi)
+        self._registers = b''
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.update(0.0)
+
+    def update(self, t: float) -> None:
+        """按时间 t (秒) 刷新寄存器内容"""
+        mvs = []
+        for conv, setpoint in zip(self._converters, self._setpoints):
+            temp = setpoint + 5.0 * math.sin(0.5 * t + self._phase)
+            mvs.append(conv.temp_to_mv(temp))
+        self._registers = struct.pack(f'>{len(mvs)}f', *mvs)
+
+    async def start(self) -> None:
+        """启动监听，port 为 0 时由系统分配端口"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """逐个处理请求，客户端可以不等响应连续发送"""
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                tid, protocol, length, unit = MBAP_HEADER.unpack(header)
+                pdu = await reader.readexactly(length - 1)
+                function = pdu[0]
+                if function != READ_HOLDING_REGISTERS:
+                    response = struct.pack('>BB', function | 0x80, 1)  # 不支持的功能码
+                else:
+                    address, count = struct.unpack('>HH', pdu[1:5])
+                    start, end = address * 2, (address + count) * 2
+                    if count < 1 or count > MAX_REGISTERS or end > len(self._registers):
+                        response = struct.pack('>BB', function | 0x80, 2)  # 非法数据地址
+                    else:
+                        data = self._registers[start:end]
+                        response = struct.pack('>BB', function, len(data)) + data
+                writer.write(MBAP_HEADER.pack(tid, protocol, len(response) + 1, unit) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+async def _refresh(plcs: Sequence[SimulatedPLC], period: float) -> None:
+    """周期刷新全部模拟设备的寄存器"""
+    start = time.perf_counter()
+    while True:
+        await asyncio.sleep(period)
+        t = time.perf_counter() - start
+        for plc in plcs:
+            plc.update(t)
+
+async def load_test(devices: int = 100, channels: int = 16, interval: float = 0.1,
+                    duration: float = 10.0, max_inflight: int = 4) -> Dict[str, float]:
+    """启动模拟设备和轮询服务，运行 duration 秒后返回统计结果"""
+    with contextlib.redirect_stdout(sys.stderr):
+        converter = KTypeConverter()
+    types = ('K', 'E', 'S')
+    plcs = [SimulatedPLC([types[(d + c) % len(types)] for c in range(channels)], converter)
+            for d in range(devices)]
+    for plc in plcs:
+        await plc.start()
+    refresher = asyncio.ensure_future(_refresh(plcs, 0.5))
+
+    published = 0
+
+    def publish(device: str, timestamp: float, values: Dict[int, float]) -> None:
+        nonlocal published
+        published += len(values)
+
+    service = PollService(
+        [Device(f"PLC{i:03d}", plc.host, plc.port, plc.types) for i, plc in enumerate(plcs)],
+        converter, interval=interval, max_inflight=max_inflight, publish=publish)
+    try:
+        await service.run(duration)
+    finally:
+        refresher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await refresher
+        for plc in plcs:
+            await plc.stop()
+    report = service.report()
+    report['published'] = published
+    return report
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口: 本机压力测试"""
+    parser = argparse.ArgumentParser(description="Modbus/TCP 采集服务压力测试 (本机模拟 PLC)")
+    parser.add_argument('--devices', type=int, default=100, help="模拟设备数")
+    parser.add_argument('--channels', type=int, default=16, help="每台设备的通道数")
+    parser.add_argument('--interval', type=float, default=0.1, help="轮询周期(秒)")
+    parser.add_argument('--duration', type=float, default=10.0, help="测试时长(秒)")
+    parser.add_argument('--max-inflight', type=int, default=4, help="每台设备的在途请求上限")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(load_test(args.devices, args.channels, args.interval,
+                                   args.duration, args.max_inflight))
+    print(f"设备数: {report['devices']}, 轮询次数: {report['polls']}, 错误: {report['errors']}")
+    print(f"吞吐量: {report['polls_per_sec']:,.0f} 次轮询/秒, {report['readings_per_sec']:,.0f} 点/秒")
+    print(f"轮询延迟: p50 {report['latency_p50_ms']:.2f}ms, p95 {report['latency_p95_ms']:.2f}ms, "
+          f"p99 {report['latency_p99_ms']:.2f}ms, 最大 {report['latency_max_ms']:.2f}ms")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
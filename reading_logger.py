@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""温度读数高速记录
+
+采集线程把读数放入固定容量的环形缓冲区后立即返回，后台写入线程成批取出，
+在一个事务中用 executemany 写入 SQLite (WAL 模式)。
+缓冲区满时按 policy 处理:
+    'block'        阻塞调用方直到有空位 (可设超时，超时后丢弃并返回 False)
+    'drop_oldest'  覆盖最旧的未写入读数
+    'drop_newest'  丢弃新读数
+三种策略下丢弃的读数都计入 dropped，不会静默消失。
+
+可直接作为 PollService 的 publish 回调:
+    logger = ReadingLogger('readings.db')
+    service = PollService(devices, publish=logger.publish)
+
+压力测试:
+    python reading_logger.py --seconds 5 --batch 5000
+    python reading_logger.py --seconds 5 --slow-disk 0.2 --policy drop_oldest
+"""
+
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS readings (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        channel TEXT NOT NULL,
+        "temp" REAL
+    )""",
+    'CREATE INDEX IF NOT EXISTS ix_readings_ts ON readings (ts)',
+)
+
+# WAL 模式下 synchronous=NORMAL 只在检查点时同步，掉电最多丢失最近的事务，不会损坏数据库
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA wal_autocheckpoint=10000',
+)
+
+class ReadingLogger:
+    """环形缓冲 + 后台批量写入的读数记录器
+
+    capacity 为缓冲区容量 (条)，batch_size 为单个事务写入的最大条数，
+    flush_interval 为未攒满一批时的最长等待时间(秒)。
+    """
+
+    def __init__(self, path, capacity: int = 100000, batch_size: int = 5000,
+                 flush_interval: float = 0.5, policy: str = 'block',
+                 block_timeout: Optional[float] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"不支持的缓冲策略: {policy}")
+        if capacity <= 0 or batch_size <= 0:
+            raise ValueError("缓冲区容量和批大小必须大于0")
+        self.path = os.fspath(path)
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        # drop_oldest 利用 deque 的 maxlen 自动覆盖最旧元素
+        self._buffer: deque = deque(maxlen=capacity if policy == 'drop_oldest' else None)
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        # 统计
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.blocked_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.max_depth = 0
+        self._started = time.perf_counter()
+        self._write_seconds = 0.0
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        for sql in PRAGMAS:
+            self._conn.execute(sql)
+        for sql in SCHEMA:
+            self._conn.execute(sql)
+        self._thread = threading.Thread(target=self._writer, name='reading-logger', daemon=True)
+        self._thread.start()
+
+    def log(self, ts: float, channel: str, temp: float) -> bool:
+        """记录一条读数，被丢弃时返回 False"""
+        return self.log_many(((ts, channel, temp),)) == 1
+
+    def log_many(self, readings: Iterable[Tuple[float, str, float]]) -> int:
+        """记录多条读数，返回进入缓冲区的条数"""
+        rows = list(readings)
+        with self._lock:
+            self._check()
+            accepted = 0
+            buffer = self._buffer
+            if self.policy == 'drop_oldest':
+                overflow = len(buffer) + len(rows) - self.capacity
+                if overflow > 0:
+                    self.dropped += overflow
+                buffer.extend(rows)
+                accepted = len(rows)
+            elif self.policy == 'drop_newest':
+                accepted = max(0, min(len(rows), self.capacity - len(buffer)))
+                buffer.extend(rows[:accepted])
+                self.dropped += len(rows) - accepted
+            else:
+                deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+                while accepted < len(rows):
+                    space = self.capacity - len(buffer)
+                    if space <= 0:
+                        start = time.perf_counter()
+                        timeout = None if deadline is None else deadline - time.monotonic()
+                        if timeout is not None and timeout <= 0:
+                            break
+                        self._not_full.wait(timeout)
+                        self.blocked_seconds += time.perf_counter() - start
+                        self._check()
+                        continue
+                    buffer.extend(rows[accepted:accepted + space])
+                    accepted += min(space, len(rows) - accepted)
+                    self._not_empty.notify()
+                self.dropped += len(rows) - accepted
+            self.received += len(rows)
+            if len(buffer) > self.max_depth:
+                self.max_depth = len(buffer)
+            if len(buffer) >= self.batch_size:
+                self._not_empty.notify()
+        return accepted
+
+    def publish(self, device: str, timestamp: float, values: Dict[int, float]) -> None:
+        """PollService 的 publish 回调: 通道名为 "设备名/通道序号" """
+        self.log_many((timestamp, f"{device}/{index}", temp) for index, temp in values.items())
+
+    def _check(self) -> None:
+        """写入线程出错或记录器已关闭时拒绝新的读数"""
+        if self._error is not None:
+            raise RuntimeError(f"读数写入失败: {self._error}")
+        if self._closed:
+            raise RuntimeError("读数记录器已关闭")
+
+    def _take_batch(self) -> list:
+        """等待攒满一批或超时，取出至多 batch_size 条读数"""
+        with self._lock:
+            if len(self._buffer) < self.batch_size and not self._closed:
+                self._not_empty.wait(self.flush_interval)
+            buffer = self._buffer
+            count = min(len(buffer), self.batch_size)
+            batch = [buffer.popleft() for _ in range(count)]
+            if batch:
+                self._not_full.notify_all()
+            return batch
+
+    def _writer(self) -> None:
+        """后台写入线程"""
+        conn = self._conn
+        try:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    if self._closed:
+                        return
+                    continue
+                start = time.perf_counter()
+                conn.execute('BEGIN')
+                conn.executemany('INSERT INTO readings (ts, channel, "temp") VALUES (?, ?, ?)', batch)
+                conn.execute('COMMIT')
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.written += len(batch)
+                    self.flushes += 1
+                    self._write_seconds += elapsed
+                    if elapsed > self.max_flush_seconds:
+                        self.max_flush_seconds = elapsed
+        except BaseException as e:
+            with self._lock:
+                self._error = e
+                self._not_full.notify_all()
+
+    def close(self) -> None:
+        """写完缓冲区中的全部读数后关闭"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._not_empty.notify_all()
+        self._thread.join()
+        self._conn.close()
+        if self._error is not None:
+            raise RuntimeError(f"读数写入失败: {self._error}")
+
+    def __enter__(self) -> 'ReadingLogger':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def report(self) -> Dict[str, float]:
+        """吞吐量和缓冲统计"""
+        with self._lock:
+            elapsed = time.perf_counter() - self._started
+            return {
+                'received': self.received,
+                'written': self.written,
+                'dropped': self.dropped,
+                'pending': len(self._buffer),
+                'max_depth': self.max_depth,
+                'flushes': self.flushes,
+                'elapsed': elapsed,
+                'rows_per_sec': self.written / elapsed if elapsed > 0 else 0.0,
+                # 纯写入速率: 只计事务耗时，反映磁盘能力上限
+                'write_rows_per_sec': self.written / self._write_seconds if self._write_seconds else 0.0,
+                'avg_batch': self.written / self.flushes if self.flushes else 0.0,
+                'max_flush_ms': self.max_flush_seconds * 1000,
+                'blocked_seconds': self.blocked_seconds,
+            }
+
+class _SlowDiskLogger(ReadingLogger):
+    """每批写入前额外等待 delay 秒，模拟慢速磁盘"""
+    delay = 0.0
+
+    def _take_batch(self) -> list:
+        batch = super()._take_batch()
+        if batch:
+            time.sleep(self.delay)
+        return batch
+
+def load_test(path: str, seconds: float = 5.0, channels: int = 64, batch_size: int = 5000,
+              capacity: int = 100000, policy: str = 'block', slow_disk: float = 0.0) -> Dict[str, float]:
+    """以最快速度产生读数 seconds 秒，返回记录器统计
+
+    slow_disk 大于 0 时每次事务后额外等待该秒数，模拟慢速磁盘以观察背压行为。
+    """
+    logger_class = ReadingLogger if slow_disk <= 0 else _SlowDiskLogger
+    logger = logger_class(path, capacity=capacity, batch_size=batch_size, policy=policy)
+    logger.delay = slow_disk
+    names = [f"CH{i:03d}" for i in range(channels)]
+    deadline = time.perf_counter() + seconds
+    with logger:
+        t = 0.0
+        while time.perf_counter() < deadline:
+            t += 0.001
+            logger.log_many((t, name, 20.0 + math.sin(t + i)) for i, name in enumerate(names))
+    return logger.report()
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口: 写入吞吐量和背压测试"""
+    parser = argparse.ArgumentParser(description="读数记录器压力测试")
+    parser.add_argument('--db', default=None, help="数据库文件，缺省使用临时文件")
+    parser.add_argument('--seconds', type=float, default=5.0, help="产生读数的时长(秒)")
+    parser.add_argument('--channels', type=int, default=64, help="每次产生的通道数")
+    parser.add_argument('--batch', type=int, default=5000, help="每个事务写入的最大条数")
+    parser.add_argument('--capacity', type=int, default=100000, help="环形缓冲区容量")
+    parser.add_argument('--policy', choices=POLICIES, default='block', help="缓冲区满时的处理策略")
+    parser.add_argument('--slow-disk', type=float, default=0.0, help="每次事务后额外等待的秒数")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.db or os.path.join(workdir, 'readings.db')
+        report = load_test(path, args.seconds, args.channels, args.batch, args.capacity,
+                           args.policy, args.slow_disk)
+    print(f"接收 {report['received']:,} 条, 写入 {report['written']:,} 条, 丢弃 {report['dropped']:,} 条")
+    print(f"持续写入: {report['rows_per_sec']:,.0f} 行/秒 (事务内 {report['write_rows_per_sec']:,.0f} 行/秒)")
+    print(f"事务: {report['flushes']} 次, 平均 {report['avg_batch']:,.0f} 行, 最长 {report['max_flush_ms']:.1f}ms")
+    print(f"缓冲区最大深度 {report['max_depth']:,}, 生产者阻塞 {report['blocked_seconds']:.2f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""读数多分辨率聚合 (增量)
+
+在 reading_logger 写入的 readings 表之上维护按分钟、按小时的聚合表，
+每个桶保存 个数/总和/最小/最大，均值由 总和/个数 得出，因此新数据可以直接合并，
+不需要回头重算。处理进度用 readings.id 水位记录，迟到的旧时间戳读数同样被正确合并。
+
+查询时在 原始数据/分钟/小时 中选择能整除所需步长的最粗分辨率，
+例如按 15 分钟出点时扫分钟表，按天出点时扫小时表。
+
+用法:
+    python rollup.py readings.db                             增量聚合一次
+    python rollup.py readings.db --follow 5                  每 5 秒增量聚合一次
+    python rollup.py readings.db --query CH000 --step 3600   输出 CH000 每小时的 最小/均值/最大
+"""
+
+import argparse
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, Float, Integer, String, cast, create_engine, event, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import declarative_base
+
+# 创建基类
+Base = declarative_base()
+
+class Reading(Base):
+    """原始读数表 (由 reading_logger 写入)"""
+    __tablename__ = 'readings'
+
+    id = Column(Integer, primary_key=True)
+    ts = Column(Float, nullable=False, index=True, comment='时间戳(秒)')
+    channel = Column(String, nullable=False, comment='通道')
+    temp = Column(Float, comment='温度，超出范围为 NULL')
+
+class RollupMixin:
+    """聚合表公共字段，bucket 为桶起始时间 (秒，按分辨率对齐)"""
+    channel = Column(String, primary_key=True, comment='通道')
+    bucket = Column(Integer, primary_key=True, comment='桶起始时间')
+    count = Column(Integer, nullable=False, comment='有效读数个数')
+    total = Column(Float, comment='温度总和')
+    min = Column(Float, comment='最低温度')
+    max = Column(Float, comment='最高温度')
+
+class Rollup1m(RollupMixin, Base):
+    """分钟聚合表"""
+    __tablename__ = 'readings_1m'
+
+class Rollup1h(RollupMixin, Base):
+    """小时聚合表"""
+    __tablename__ = 'readings_1h'
+
+class RollupState(Base):
+    """聚合进度: 已处理到的 readings.id"""
+    __tablename__ = 'rollup_state'
+
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False)
+
+# 分辨率(秒) -> 聚合表，按从细到粗排列
+ROLLUPS = {60: Rollup1m.__table__, 3600: Rollup1h.__table__}
+
+class Bucket(NamedTuple):
+    """查询结果中的一个时间桶"""
+    start: int
+    count: int
+    mean: Optional[float]
+    min: Optional[float]
+    max: Optional[float]
+
+def _merge_extreme(old, new, pick):
+    """合并最值，任一方为 NULL 时取另一方 (SQLite 的多参数 min/max 遇 NULL 返回 NULL)"""
+    return pick(func.coalesce(old, new), func.coalesce(new, old))
+
+def _set_pragmas(dbapi_connection, connection_record):
+    """与 reading_logger 一致使用 WAL，聚合时不阻塞写入线程"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
+
+class RollupEngine:
+    """增量聚合与范围查询
+
+    update() 每次最多处理 chunk_size 条新读数 (一个事务)，循环直到没有新读数。
+    """
+
+    def __init__(self, path: str, chunk_size: int = 200000):
+        self.engine = create_engine(f'sqlite:///{path}')
+        event.listen(self.engine, 'connect', _set_pragmas)
+        Base.metadata.create_all(self.engine)
+        self.chunk_size = chunk_size
+
+    def close(self) -> None:
+        """释放连接池"""
+        self.engine.dispose()
+
+    def update(self) -> int:
+        """把水位之后的新读数合并进各级聚合表，返回处理的读数条数"""
+        processed = 0
+        while True:
+            count = self._update_chunk()
+            if not count:
+                return processed
+            processed += count
+
+    def _update_chunk(self) -> int:
+        """处理水位之后的至多 chunk_size 条读数"""
+        readings = Reading.__table__
+        state = RollupState.__table__
+        with self.engine.begin() as conn:
+            last_id = conn.execute(select(state.c.last_id).where(state.c.name == 'readings')).scalar() or 0
+            # 按行数而不是 id 差值取上界，id 中的空洞 (删除、回滚) 不会卡住水位
+            after = select(readings.c.id).where(readings.c.id > last_id)
+            high_id = conn.execute(
+                after.order_by(readings.c.id).offset(self.chunk_size - 1).limit(1)
+            ).scalar()
+            if high_id is None:
+                high_id = conn.execute(select(func.max(readings.c.id)).where(readings.c.id > last_id)).scalar()
+            if high_id is None:
+                return 0
+            finest = min(ROLLUPS)
+            bucket = (cast(readings.c.ts / finest, Integer) * finest).label('bucket')
+            rows = conn.execute(
+                select(readings.c.channel, bucket, func.count(readings.c.temp), func.sum(readings.c.temp),
+                       func.min(readings.c.temp), func.max(readings.c.temp), func.count())
+                .where(readings.c.id > last_id, readings.c.id <= high_id)
+                .group_by(readings.c.channel, bucket)
+            ).all()
+
+            # 最细一级由 SQL 聚合，更粗的级别在内存中由最细一级的增量折叠得出
+            delta: Dict[Tuple[str, int], list] = {(r[0], r[1]): list(r[2:6]) for r in rows}
+            for resolution, table in ROLLUPS.items():
+                if resolution != finest:
+                    delta = _fold(delta, resolution)
+                stmt = insert(table)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.channel, table.c.bucket],
+                    set_={
+                        'count': table.c['count'] + stmt.excluded['count'],
+                        'total': func.coalesce(table.c.total, 0) + func.coalesce(stmt.excluded.total, 0),
+                        'min': _merge_extreme(table.c.min, stmt.excluded.min, func.min),
+                        'max': _merge_extreme(table.c.max, stmt.excluded.max, func.max),
+                    })
+                conn.execute(stmt, [
+                    {'channel': channel, 'bucket': start, 'count': count, 'total': total, 'min': low, 'max': high}
+                    for (channel, start), (count, total, low, high) in delta.items()
+                ])
+
+            upsert = insert(state).values(name='readings', last_id=high_id)
+            conn.execute(upsert.on_conflict_do_update(index_elements=[state.c.name], set_={'last_id': high_id}))
+            return sum(r[6] for r in rows)
+
+    def choose_resolution(self, step: float) -> int:
+        """能整除 step 的最粗分辨率，都不满足时返回 0 (原始数据)"""
+        best = 0
+        for resolution in ROLLUPS:
+            if resolution <= step and step % resolution == 0:
+                best = resolution
+        return best
+
+    def query(self, channel: str, start: float, end: float, step: Optional[float] = None,
+              max_points: Optional[int] = None, refresh: bool = True) -> Tuple[int, List[Bucket]]:
+        """查询 [start, end) 内按 step 秒分桶的 个数/均值/最小/最大
+
+        只给 max_points 时步长取能容纳在 max_points 个点内的最小分辨率整数倍。
+        返回 (实际使用的分辨率, 桶列表)，分辨率 0 表示只扫描了原始读数。
+        """
+        if step is None:
+            if not max_points:
+                raise ValueError("需要指定 step 或 max_points")
+            step = _fit_step((end - start) / max_points)
+        if step <= 0:
+            raise ValueError("步长必须大于0")
+        if refresh:
+            self.update()
+        resolution = self.choose_resolution(step)
+        raw = Reading.__table__
+        ranges = [(raw, start, end)]
+        if resolution:
+            # 聚合桶只用完全落在 [start, end) 内的部分，两端不完整的桶从原始读数补齐，
+            # 结果与直接扫描原始读数一致
+            inner_start = -(-start // resolution) * resolution
+            inner_end = end // resolution * resolution
+            if inner_start < inner_end:
+                ranges = [(raw, start, inner_start), (ROLLUPS[resolution], inner_start, inner_end),
+                          (raw, inner_end, end)]
+            else:
+                resolution = 0
+        merged: Dict[float, list] = {}
+        with self.engine.connect() as conn:
+            for table, low_ts, high_ts in ranges:
+                if low_ts >= high_ts:
+                    continue
+                for key, *values in conn.execute(_bucket_stmt(table, channel, low_ts, high_ts, step)):
+                    _accumulate(merged, key, *values)
+        return resolution, [Bucket(int(key), n, t / n if n else None, lo, hi)
+                            for key, (n, t, lo, hi) in sorted(merged.items())]
+
+    def __enter__(self) -> 'RollupEngine':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def _accumulate(result: dict, key, count, total, low, high) -> None:
+    """把一个桶的 个数/总和/最小/最大 合并进 result[key]"""
+    acc = result.get(key)
+    if acc is None:
+        result[key] = [count, total, low, high]
+        return
+    acc[0] += count
+    if total is not None:
+        acc[1] = total if acc[1] is None else acc[1] + total
+    if low is not None and (acc[2] is None or low < acc[2]):
+        acc[2] = low
+    if high is not None and (acc[3] is None or high > acc[3]):
+        acc[3] = high
+
+def _fold(delta: Dict[Tuple[str, int], list], resolution: int) -> Dict[Tuple[str, int], list]:
+    """把细粒度增量合并到更粗的桶"""
+    result: Dict[Tuple[str, int], list] = {}
+    for (channel, start), values in delta.items():
+        _accumulate(result, (channel, start // resolution * resolution), *values)
+    return result
+
+def _bucket_stmt(table, channel: str, start: float, end: float, step: float):
+    """按 step 分桶汇总 table 中 [start, end) 内的数据，table 为原始读数表或聚合表"""
+    if table is Reading.__table__:
+        time_col, count, total = table.c.ts, func.count(table.c.temp), func.sum(table.c.temp)
+        low, high = func.min(table.c.temp), func.max(table.c.temp)
+    else:
+        time_col, count, total = table.c.bucket, func.sum(table.c['count']), func.sum(table.c.total)
+        low, high = func.min(table.c.min), func.max(table.c.max)
+    key = (cast(time_col / step, Integer) * step).label('start')
+    return (select(key, count, total, low, high)
+            .where(table.c.channel == channel, time_col >= start, time_col < end)
+            .group_by(key))
+
+def _fit_step(span: float) -> float:
+    """不小于 span 的步长: 不足一分钟时原样使用，否则取分钟/小时的整数倍"""
+    for resolution in sorted(ROLLUPS, reverse=True):
+        if span >= resolution:
+            return -(-span // resolution) * resolution
+    return span
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="读数增量聚合与查询")
+    parser.add_argument('db', help="readings 数据库文件")
+    parser.add_argument('--follow', type=float, default=None, help="按该周期(秒)持续增量聚合")
+    parser.add_argument('--query', metavar='CHANNEL', help="查询指定通道")
+    parser.add_argument('--start', type=float, default=0.0, help="查询起始时间戳")
+    parser.add_argument('--end', type=float, default=None, help="查询结束时间戳，缺省为当前时间")
+    parser.add_argument('--step', type=float, default=None, help="查询步长(秒)")
+    parser.add_argument('--points', type=int, default=500, help="未指定步长时的最大点数")
+    args = parser.parse_args(argv)
+
+    with RollupEngine(args.db) as engine:
+        if args.query:
+            end = args.end if args.end is not None else time.time()
+            resolution, buckets = engine.query(args.query, args.start, end, args.step, args.points)
+            print(f"使用分辨率: {resolution or '原始数据'}{'秒' if resolution else ''}, {len(buckets)} 个点")
+            for b in buckets:
+                mean = '-' if b.mean is None else f"{b.mean:.2f}"
+                low = '-' if b.min is None else f"{b.min:.2f}"
+                high = '-' if b.max is None else f"{b.max:.2f}"
+                print(f"{b.start:>12d}  {b.count:>8d}  {low:>8}  {mean:>8}  {high:>8}")
+            return 0
+        while True:
+            start = time.perf_counter()
+            count = engine.update()
+            print(f"聚合 {count} 条读数, 耗时 {time.perf_counter() - start:.3f}s")
+            if args.follow is None:
+                return 0
+            time.sleep(args.follow)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,42 +1,122 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from sqlalchemy import create_engine, Column, Integer, String, Float
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import func, select, text
+from db import Database
+# 模型和基本增删查在 student_store 中，与 data.py / table.py 共用
+from student_store import (GRADES, INSERT_SQL, Base, StudentScore, create_schema, create_student, fetch_page,
+                           grade_condition, summarize, validate_name, validate_score)
+import csv
 import sys
+import time
 
-# 创建基类
-Base = declarative_base()
-
-class StudentScore(Base):
-    """学生成绩表"""
-    __tablename__ = 'student_scores'
-    
-    id = Column(Integer, primary_key=True, comment='编号')
-    name = Column(String(20), nullable=False, comment='姓名')
-    chinese = Column(Integer, comment='语文')
-    math = Column(Integer, comment='数学')
-    physics = Column(Integer, comment='物理')
-    chemistry = Column(Integer, comment='化学')
-
-    @property
-    def average(self):
-        """计算平均分"""
-        scores = [self.chinese, self.math, self.physics, self.chemistry]
-        return sum(scores) / len(scores)
-
-    def __repr__(self):
-        return f"<Student {self.name}>"
-
-def validate_score(score_str: str) -> int:
-    """验证分数输入"""
+# 稳定ID模式: 删除后不重新编号，显示时按顺序给出连续的序号 (命令行参数 --stable-ids 开启)
+stable_ids = False
+
+# 显示记录时每页的条数，交互模式下每页之后暂停 (命令行参数 --page-size 修改)
+PAGE_SIZE = 20
+
+# CSV 导入导出每批的行数，导入时每批一个事务 (命令行参数 --batch-size 修改)
+BATCH_SIZE = 10000
+
+# CSV 列名，导入时也接受英文列名
+CSV_COLUMNS = ('姓名', '语文', '数学', '物理', '化学')
+CSV_ALIASES = {'name': '姓名', 'chinese': '语文', 'math': '数学', 'physics': '物理', 'chemistry': '化学'}
+
+# 数据库连接 (连接池、WAL、busy_timeout 见 db.Database)，第一次使用时才打开 student.db；
+# 导入本模块不会改动工作目录下的数据库，测试时可先把 database 换成其他库
+database = None
+
+def get_database() -> Database:
+    """返回共享的数据库对象，第一次调用时连接 student.db 并建表"""
+    global database
+    if database is None:
+        database = Database('sqlite:///student.db')
+        create_schema(database.engine)
+    return database
+
+def iter_pages(page_size: int = PAGE_SIZE, after_id: int = 0):
+    """按ID分页 (键集分页) 逐页读取记录，每页是 (id, 姓名, 四科成绩, 平均分) 行的列表
+
+    每页都是 id > 上一页最后ID 的主键范围查询，耗时与所在位置和表大小无关。
+    """
+    # 整个遍历在同一个读事务中，WAL 下看到一致的快照且不阻塞写入
+    with get_database().read_session() as session:
+        # 直接在连接上执行，返回普通行，不经过 ORM 结果处理
+        conn = session.connection()
+        while True:
+            rows = fetch_page(conn, page_size, after_id)
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1].id
+
+def class_summary():
+    """聚合查询: (人数, 班级平均分, 优秀人数, 良好人数)"""
+    with get_database().read_session() as session:
+        summary = summarize(session)
+    return summary['count'], summary['average'], summary['grades']['优秀'], summary['grades']['良好']
+
+def grade_counts(session=None):
+    """各等级人数，每个等级是平均分索引上的一次范围计数"""
+    if session is None:
+        with get_database().read_session() as session:
+            return grade_counts(session)
+    return {
+        name: session.execute(select(func.count()).where(*grade_condition(low, high))).scalar()
+        for name, low, high in GRADES
+    }
+
+def top_students(n: int = 10):
+    """平均分最高的 n 名学生 (按平均分索引倒序读取前 n 条)"""
+    with get_database().read_session() as session:
+        return session.execute(
+            select(StudentScore).order_by(StudentScore.average.desc(), StudentScore.id).limit(n)).scalars().all()
+
+def students_above(threshold: float, limit=None):
+    """平均分不低于 threshold 的学生，按平均分从高到低"""
+    stmt = (select(StudentScore).where(StudentScore.average >= threshold)
+            .order_by(StudentScore.average.desc(), StudentScore.id))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    with get_database().read_session() as session:
+        return session.execute(stmt).scalars().all()
+
+def percentile(p: float):
+    """平均分的第 p 百分位数 (最近秩法)，没有记录时返回 None
+
+    沿平均分索引从较近的一端跳过若干条取值，不排序整表。
+    """
+    if not 0 <= p <= 100:
+        raise ValueError("百分位必须在0-100之间")
+    with get_database().read_session() as session:
+        count = session.execute(select(func.count()).select_from(StudentScore)).scalar()
+        if not count:
+            return None
+        rank = max(1, -(-p * count // 100))  # 从低到高的名次，向上取整
+        if rank <= count / 2:
+            order, offset = StudentScore.average.asc(), rank - 1
+        else:
+            order, offset = StudentScore.average.desc(), count - rank
+        return session.execute(
+            select(StudentScore.average).order_by(order).limit(1).offset(int(offset))).scalar()
+
+def show_ranking(n: int = 10):
+    """显示成绩排名和等级分布"""
     try:
-        score = int(score_str)
-        if 0 <= score <= 100:
-            return score
-        raise ValueError("分数必须在0-100之间")
-    except ValueError:
-        raise ValueError("请输入有效的分数")
+        students = top_students(n)
+        if not students:
+            print("\n暂无学生记录\n")
+            return
+        print(f"\n平均分前 {len(students)} 名：")
+        print("-" * 40)
+        for rank, s in enumerate(students, start=1):
+            print(f"{rank:3d}. {s.name:<8} {s.average:6.1f}")
+        print("-" * 40)
+        print("中位数: {:.1f}, 前10%分数线: {:.1f}".format(percentile(50), percentile(90)))
+        print("  ".join(f"{name}: {count}人" for name, count in grade_counts().items()))
+    except Exception as e:
+        print(f"查询失败: {e}")
 
 def get_valid_input(prompt: str, validator=None) -> str:
     """获取并验证用户输入"""
@@ -51,37 +131,45 @@ def get_valid_input(prompt: str, validator=None) -> str:
         except ValueError as e:
             print(f"输入错误: {e}")
 
-def show_all():
-    """显示所有学生记录"""
+def show_all(page_size=None):
+    """显示所有学生记录
+
+    记录按页流式读取和输出，内存占用与记录数无关；page_size 不为 None 时
+    每页之后暂停，回车继续，输入 q 结束浏览。平均分和等级统计由数据库聚合得出。
+    """
     try:
-        students = session.query(StudentScore).order_by(StudentScore.id).all()
-        if not students:
+        rank = 0
+        # 不分页显示时按较大的页读取，减少查询次数
+        for page in iter_pages(page_size or 1000):
+            if rank == 0:
+                print("\n当前所有学生成绩：")
+                print("=" * 60)
+                print("ID    姓名     语文  数学  物理  化学  平均分")
+                print("-" * 60)
+            for s in page:
+                rank += 1
+                avg = s.average
+                if avg >= 90:
+                    symbol = "★"  # 优秀
+                elif avg >= 80:
+                    symbol = "☆"  # 良好
+                else:
+                    symbol = " "  # 普通
+                    
+                print("{:2d}  {:^8} {:4d}  {:4d}  {:4d}  {:4d}  {:5.1f} {}".format(
+                    rank if stable_ids else s.id, s.name, s.chinese, s.math, s.physics, s.chemistry, avg, symbol))
+            if page_size is not None and len(page) == page_size:
+                if input(f"-- 已显示 {rank} 条，回车继续，q 结束 --").strip().lower() == 'q':
+                    break
+        if rank == 0:
             print("\n暂无学生记录\n")
             return
-            
-        print("\n当前所有学生成绩：")
-        print("=" * 60)
-        print("ID    姓名     语文  数学  物理  化学  平均分")
-        print("-" * 60)
-        
-        for s in students:
-            avg = s.average
-            if avg >= 90:
-                symbol = "★"  # 优秀
-            elif avg >= 80:
-                symbol = "☆"  # 良好
-            else:
-                symbol = " "  # 普通
-                
-            print("{:2d}  {:^8} {:4d}  {:4d}  {:4d}  {:4d}  {:5.1f} {}".format(
-                s.id, s.name, s.chinese, s.math, s.physics, s.chemistry, avg, symbol))
                 
         print("-" * 60)
         
-        # 计算班级平均分
-        total = len(students)
-        total_avg = sum(s.average for s in students) / total
-        print(f"班级平均分: {total_avg:.1f}")
+        # 班级统计由数据库聚合
+        total, total_avg, excellent, good = class_summary()
+        print(f"共 {total} 人, 班级平均分: {total_avg:.1f}, 优秀 {excellent} 人, 良好 {good} 人")
         print("=" * 60)
         
         # 添加图例说明
@@ -102,83 +190,215 @@ def add_student():
         physics = get_valid_input("物理成绩：", validate_score)
         chemistry = get_valid_input("化学成绩：", validate_score)
         
-        new_student = StudentScore(
-            name=name,
-            chinese=chinese,
-            math=math,
-            physics=physics,
-            chemistry=chemistry
-        )
-        session.add(new_student)
-        session.commit()
+        with get_database().write_session() as session:
+            create_student(session, name, chinese, math, physics, chemistry)
         print("添加成功！")
     except Exception as e:
         print(f"添加失败: {e}")
-        session.rollback()
+
+def _reset_sequence(session):
+    """把自增序列设为当前最大ID (不提交)"""
+    has_sequence = session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_sequence'")).first()
+    if has_sequence:
+        session.execute(
+            text("UPDATE sqlite_sequence SET seq = (SELECT coalesce(max(id), 0) FROM student_scores) "
+                 "WHERE name = 'student_scores'"))
 
 def reset_sequence():
     """重置自增序列"""
     try:
-        # 获取当前最大ID
-        max_id = session.query(StudentScore).order_by(StudentScore.id.desc()).first()
-        if max_id:
-            from sqlalchemy import text
-            try:
-                # 先检查表是否存在
-                session.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name='sqlite_sequence'"))
-                # 如果表存在则更新
-                session.execute(
-                    text('UPDATE sqlite_sequence SET seq = :seq WHERE name = :name'),
-                    {'seq': max_id.id, 'name': 'student_scores'}
-                )
-            except Exception:
-                # 如果表不存在则跳过重置
-                pass
-            finally:
-                session.commit()
+        with get_database().write_session() as session:
+            _reset_sequence(session)
     except Exception as e:
         print(f"重置序列失败: {e}")
-        session.rollback()
+
+def _renumber(session, after_id: int = 0):
+    """把 ID 大于 after_id 的记录重新编号为连续值 (不提交)
+
+    两条集合更新语句完成，不加载对象: 先把新编号取负写入，避免与尚未更新的记录主键冲突，
+    再整体取反。需要 SQLite 3.33 以上 (UPDATE ... FROM)。
+    """
+    session.execute(
+        text("UPDATE student_scores SET id = -r.new_id "
+             "FROM (SELECT id AS old_id, "
+             "             ROW_NUMBER() OVER (ORDER BY id) "
+             "             + (SELECT count(*) FROM student_scores WHERE id <= :after_id) AS new_id "
+             "      FROM student_scores WHERE id > :after_id) AS r "
+             "WHERE student_scores.id = r.old_id AND r.old_id != r.new_id"),
+        {'after_id': after_id})
+    session.execute(text("UPDATE student_scores SET id = -id WHERE id < 0"))
 
 def reorder_ids():
     """重新排序所有记录的ID"""
     try:
-        # 获取所有记录并按ID排序
-        students = session.query(StudentScore).order_by(StudentScore.id).all()
-        
-        # 重新设置ID
-        for index, student in enumerate(students, start=1):
-            student.id = index
-            
-        session.commit()
+        with get_database().write_session() as session:
+            _renumber(session)
         print("记录重新排序完成")
     except Exception as e:
         print(f"重新排序失败: {e}")
-        session.rollback()
+
+def delete_students(ids=None, id_range=None) -> int:
+    """按ID列表或闭区间 (起, 止) 批量删除，返回删除的记录数
+
+    删除、重新编号和重置序列在同一个事务中完成；稳定ID模式下不重新编号。
+    """
+    if (ids is None) == (id_range is None):
+        raise ValueError("需要指定ID列表或ID范围中的一个")
+    condition = StudentScore.id.in_(list(ids)) if ids is not None else StudentScore.id.between(*id_range)
+    with get_database().write_session() as session:
+        first = session.execute(select(func.min(StudentScore.id)).where(condition)).scalar()
+        if first is None:
+            return 0
+        deleted = session.query(StudentScore).filter(condition).delete(synchronize_session=False)
+        if not stable_ids:
+            # 只有被删除的最小ID之后的记录需要移动
+            _renumber(session, first - 1)
+            _reset_sequence(session)
+        return deleted
+
+def display_rank_to_id(rank: int):
+    """稳定ID模式下把显示序号换算为记录ID，不存在时返回 None"""
+    if rank < 1:
+        return None
+    with get_database().read_session() as session:
+        return session.execute(
+            select(StudentScore.id).order_by(StudentScore.id).limit(1).offset(rank - 1)).scalar()
+
+def parse_id_spec(spec: str):
+    """解析 "1,3,5" 或 "10-20" 形式的ID输入，返回 (ID列表, ID范围)"""
+    spec = spec.replace('，', ',').replace(' ', '')
+    if '-' in spec:
+        start, _, stop = spec.partition('-')
+        start, stop = int(start), int(stop)
+        if start > stop:
+            raise ValueError("范围起点不能大于终点")
+        return None, (start, stop)
+    return [int(part) for part in spec.split(',') if part], None
 
 def delete_student():
     """删除学生记录并重新排序"""
     try:
         student_id = get_valid_input("请输入要删除的学生ID：", int)
-        # 使用新的 API 方法
-        student = session.get(StudentScore, student_id)
-        
-        if student:
-            session.delete(student)
-            session.commit()
-            
-            # 重新排序剩余记录
-            reorder_ids()
-            
-            # 重置自增序列
-            reset_sequence()
-            print(f"已删除ID为 {student_id} 的学生并重新排序")
+        target = display_rank_to_id(student_id) if stable_ids else student_id
+        if target is not None and delete_students(ids=[target]):
+            if stable_ids:
+                print(f"已删除序号为 {student_id} 的学生")
+            else:
+                print(f"已删除ID为 {student_id} 的学生并重新排序")
         else:
             print("未找到该学生")
             
     except Exception as e:
         print(f"删除失败: {e}")
-        session.rollback()
+
+def delete_many():
+    """批量删除学生记录"""
+    try:
+        prompt = "请输入要删除的序号 (如 1,3,5 或 10-20)：" if stable_ids else "请输入要删除的学生ID (如 1,3,5 或 10-20)："
+        ids, id_range = get_valid_input(prompt, parse_id_spec)
+        if stable_ids:
+            # 序号随删除变化，先统一换算为ID
+            if id_range is not None:
+                low, high = display_rank_to_id(id_range[0]), display_rank_to_id(id_range[1])
+                if low is None:
+                    print("未找到要删除的学生")
+                    return
+                if high is None:
+                    with get_database().read_session() as session:
+                        high = session.execute(select(func.max(StudentScore.id))).scalar()
+                ids, id_range = None, (low, high)
+            else:
+                ids = [i for i in (display_rank_to_id(r) for r in ids) if i is not None]
+        deleted = delete_students(ids=ids, id_range=id_range)
+        print(f"已删除 {deleted} 条记录" if deleted else "未找到要删除的学生")
+    except Exception as e:
+        print(f"删除失败: {e}")
+
+def _parse_row(row, columns):
+    """校验一行 CSV，返回 (姓名, 语文, 数学, 物理, 化学)"""
+    name_col, chinese_col, math_col, physics_col, chemistry_col = columns
+    # int() 本身忽略首尾空白，无需 strip
+    return (validate_name(row[name_col]), validate_score(row[chinese_col]), validate_score(row[math_col]),
+            validate_score(row[physics_col]), validate_score(row[chemistry_col]))
+
+def _insert_batch(batch) -> None:
+    """一批已校验的行在一个写事务中写入"""
+    # 位置参数的 INSERT 直接交给驱动 executemany，省去逐行构造参数字典
+    with get_database().write_session() as session:
+        session.connection().exec_driver_sql(INSERT_SQL, batch)
+
+def import_csv(path: str, batch_size: int = BATCH_SIZE, max_errors: int = 20):
+    """从 CSV 批量导入学生成绩，返回 (导入行数, 错误列表)
+
+    第一行为表头 (姓名,语文,数学,物理,化学，列顺序不限)。每行用 validate_score 校验，
+    无效行跳过并记录 (行号, 原因)，错误列表最多保留 max_errors 条。
+    有效行每 batch_size 行用一次 executemany 写入并提交。
+    """
+    imported = 0
+    errors = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [CSV_ALIASES.get(h.strip().lower(), h.strip()) for h in next(reader, [])]
+        missing = [c for c in CSV_COLUMNS if c not in header]
+        if missing:
+            raise ValueError(f"CSV 缺少列: {', '.join(missing)}")
+        columns = [header.index(c) for c in CSV_COLUMNS]
+        width = max(columns) + 1
+        batch = []
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            try:
+                if len(row) < width:
+                    raise ValueError("列数不足")
+                batch.append(_parse_row(row, columns))
+            except ValueError as e:
+                if len(errors) < max_errors:
+                    errors.append((line, str(e)))
+                continue
+            if len(batch) >= batch_size:
+                _insert_batch(batch)
+                imported += len(batch)
+                batch = []
+        if batch:
+            _insert_batch(batch)
+            imported += len(batch)
+    return imported, errors
+
+def export_csv(path: str, batch_size: int = BATCH_SIZE) -> int:
+    """按页流式导出全部记录 (含平均分)，返回导出行数"""
+    count = 0
+    # BOM 手动写出，便于 Excel 识别；之后按普通 UTF-8 写入
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('\ufeff')
+        writer = csv.writer(f)
+        writer.writerow(('ID',) + CSV_COLUMNS + ('平均分',))
+        for page in iter_pages(batch_size):
+            writer.writerows(page)
+            count += len(page)
+    return count
+
+def import_students():
+    """交互式导入 CSV"""
+    try:
+        path = get_valid_input("请输入 CSV 文件路径：")
+        start = time.perf_counter()
+        imported, errors = import_csv(path)
+        elapsed = time.perf_counter() - start
+        print(f"已导入 {imported} 条记录, 耗时 {elapsed:.2f} 秒")
+        for line, reason in errors:
+            print(f"  第 {line} 行已跳过: {reason}")
+    except Exception as e:
+        print(f"导入失败: {e}")
+
+def export_students():
+    """交互式导出 CSV"""
+    try:
+        path = get_valid_input("请输入导出文件路径：")
+        print(f"已导出 {export_csv(path)} 条记录到 {path}")
+    except Exception as e:
+        print(f"导出失败: {e}")
 
 def print_menu():
     """打印菜单界面"""
@@ -190,32 +410,58 @@ def print_menu():
     1. 显示所有记录
     2. 添加新记录
     3. 删除记录
-    4. 退出系统
+    4. 批量删除记录
+    5. 从CSV导入
+    6. 导出到CSV
+    7. 成绩排名
+    8. 退出系统
 
 =======================
 """
     print(menu)
 
-# 初始化数据库连接
-engine = create_engine('sqlite:///student.db', echo=False)
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-session = Session()
-
 if __name__ == "__main__":
+    stable_ids = '--stable-ids' in sys.argv
+    for arg in sys.argv[1:]:
+        if arg.startswith('--page-size='):
+            PAGE_SIZE = max(1, int(arg.split('=', 1)[1]))
+        elif arg.startswith('--batch-size='):
+            BATCH_SIZE = max(1, int(arg.split('=', 1)[1]))
+    # 非交互的导入/导出: --import=文件 / --export=文件
+    for arg in sys.argv[1:]:
+        if arg.startswith('--import='):
+            start = time.perf_counter()
+            imported, errors = import_csv(arg.split('=', 1)[1], BATCH_SIZE)
+            elapsed = time.perf_counter() - start
+            print(f"已导入 {imported} 条记录, 耗时 {elapsed:.2f} 秒, {imported / elapsed:,.0f} 行/秒")
+            for line, reason in errors:
+                print(f"  第 {line} 行已跳过: {reason}")
+            sys.exit(0)
+        if arg.startswith('--export='):
+            print(f"已导出 {export_csv(arg.split('=', 1)[1], BATCH_SIZE)} 条记录")
+            sys.exit(0)
+    get_database()
     try:
         while True:
             try:
                 print_menu()
-                choice = get_valid_input("\n请选择操作(1-4): ")
+                choice = get_valid_input("\n请选择操作(1-8): ")
                 
                 if choice == '1':
-                    show_all()
+                    show_all(PAGE_SIZE)
                 elif choice == '2':
                     add_student()
                 elif choice == '3':
                     delete_student()
                 elif choice == '4':
+                    delete_many()
+                elif choice == '5':
+                    import_students()
+                elif choice == '6':
+                    export_students()
+                elif choice == '7':
+                    show_ranking()
+                elif choice == '8':
                     print("\n正在退出程序...")
                     break
                 else:
@@ -230,5 +476,5 @@ if __name__ == "__main__":
         print("\n\n程序被用户中断")
     finally:
         print("\n正在关闭数据库连接...")
-        session.close()
+        get_database().dispose()
         print("程序已退出！")
\ No newline at end of file
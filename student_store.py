@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""学生成绩数据访问: StudentScore 模型和增删查
+
+sqdata.py / data.py / table.py 共用这里的模型和基本增删查函数。
+每个操作有同步和异步两个版本，查询语句由同一组函数构造:
+    同步: fetch_page(session, ...)              session 为 db.Database 给出的 Session
+    异步: await fetch_page_async(session, ...)  session 为 db.AsyncDatabase 给出的 AsyncSession
+写操作只在会话中执行，不提交，由调用方的 write_session() 统一提交或回滚。
+
+异步负载测试 (事件循环延迟反映是否被阻塞):
+    python student_store.py --requests 2000 --concurrency 300
+    python student_store.py --requests 2000 --concurrency 300 --blocking   对照: 在协程中直接调用同步接口
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, Computed, Float, Integer, String, delete, func, select
+from sqlalchemy.orm import declarative_base
+
+# 创建基类
+Base = declarative_base()
+
+# 平均分的计算式
+AVERAGE_SQL = '(chinese + math + physics + chemistry) / 4.0'
+
+class StudentScore(Base):
+    """学生成绩表"""
+    __tablename__ = 'student_scores'
+
+    id = Column(Integer, primary_key=True, comment='编号')
+    name = Column(String(20), nullable=False, index=True, comment='姓名')
+    chinese = Column(Integer, comment='语文')
+    math = Column(Integer, comment='数学')
+    physics = Column(Integer, comment='物理')
+    chemistry = Column(Integer, comment='化学')
+    # 平均分为数据库生成列，随四科成绩自动更新；VIRTUAL 列可以用 ALTER TABLE 补加，索引中保存计算结果
+    average = Column(Float, Computed(AVERAGE_SQL, persisted=False), index=True, comment='平均分')
+
+    def __repr__(self):
+        return f"<Student {self.name}>"
+
+# 成绩等级: (名称, 平均分下限, 上限)，区间左闭右开
+GRADES = (('优秀', 90, None), ('良好', 80, 90), ('及格', 60, 80), ('不及格', None, 60))
+
+# 批量写入的语句，位置参数直接交给驱动 executemany
+INSERT_SQL = "INSERT INTO student_scores (name, chinese, math, physics, chemistry) VALUES (?, ?, ?, ?, ?)"
+
+def _migrate(conn) -> None:
+    """旧数据库补加平均分生成列和索引 (需要 SQLite 3.31 以上)"""
+    columns = [row[1] for row in conn.exec_driver_sql("PRAGMA table_xinfo(student_scores)")]
+    if 'average' not in columns:
+        conn.exec_driver_sql(
+            f"ALTER TABLE student_scores ADD COLUMN average FLOAT GENERATED ALWAYS AS ({AVERAGE_SQL}) VIRTUAL")
+    for index in StudentScore.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+def migrate_schema(bind) -> None:
+    """在引擎上执行 _migrate"""
+    with bind.begin() as conn:
+        _migrate(conn)
+
+def create_schema(bind) -> None:
+    """建表并补齐旧库缺少的列和索引"""
+    Base.metadata.create_all(bind)
+    migrate_schema(bind)
+
+async def create_schema_async(engine) -> None:
+    """create_schema 的异步版本，engine 为 AsyncEngine"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_migrate)
+
+def validate_score(score_str) -> int:
+    """验证分数输入"""
+    try:
+        score = int(score_str)
+        if 0 <= score <= 100:
+            return score
+        raise ValueError("分数必须在0-100之间")
+    except ValueError:
+        raise ValueError("请输入有效的分数")
+
+def validate_name(name: str) -> str:
+    """验证姓名，返回去掉首尾空白的姓名"""
+    name = name.strip()
+    if not name:
+        raise ValueError("姓名不能为空")
+    if len(name) > 20:
+        raise ValueError("姓名不能超过20个字符")
+    return name
+
+def grade_condition(low, high) -> list:
+    """平均分区间条件"""
+    conditions = []
+    if low is not None:
+        conditions.append(StudentScore.average >= low)
+    if high is not None:
+        conditions.append(StudentScore.average < high)
+    return conditions
+
+def _page_stmt(page_size: int, after_id: int):
+    """id > after_id 的一页记录 (键集分页)"""
+    return (select(StudentScore.id, StudentScore.name, StudentScore.chinese, StudentScore.math,
+                   StudentScore.physics, StudentScore.chemistry, StudentScore.average)
+            .where(StudentScore.id > after_id).order_by(StudentScore.id).limit(page_size))
+
+def _summary_stmt():
+    """人数、班级平均分和各等级人数
+
+    每一项都是平均分索引上的扫描或范围计数，不读表行，也不逐行计算生成列。
+    """
+    average = StudentScore.average
+    return select(
+        select(func.count()).select_from(StudentScore).scalar_subquery(),
+        # 平均分不小于 0，加上这个条件让 SQLite 从索引中读取平均分
+        select(func.avg(average)).where(average >= 0).scalar_subquery(),
+        *[select(func.count()).where(*grade_condition(low, high)).scalar_subquery() for _, low, high in GRADES])
+
+def _summary(row) -> Dict[str, object]:
+    count, average, *grades = row
+    return {'count': count, 'average': average,
+            'grades': {name: n for (name, _, _), n in zip(GRADES, grades)}}
+
+def _new_student(name: str, chinese, math, physics, chemistry) -> StudentScore:
+    """校验后构造记录"""
+    return StudentScore(name=validate_name(name), chinese=validate_score(chinese), math=validate_score(math),
+                        physics=validate_score(physics), chemistry=validate_score(chemistry))
+
+def _validated_rows(rows: Iterable[Sequence]) -> List[Tuple[str, int, int, int, int]]:
+    """校验批量写入的 (姓名, 语文, 数学, 物理, 化学) 行"""
+    return [(validate_name(name), validate_score(chinese), validate_score(math),
+             validate_score(physics), validate_score(chemistry))
+            for name, chinese, math, physics, chemistry in rows]
+
+def _delete_stmt(ids: Iterable[int]):
+    return delete(StudentScore).where(StudentScore.id.in_(list(ids)))
+
+# ---- 同步接口 ----
+
+def fetch_page(session, page_size: int = 100, after_id: int = 0) -> list:
+    """一页 (id, 姓名, 四科成绩, 平均分) 行"""
+    return session.execute(_page_stmt(page_size, after_id)).all()
+
+def summarize(session) -> Dict[str, object]:
+    """{'count': 人数, 'average': 班级平均分, 'grades': {等级: 人数}}"""
+    return _summary(session.execute(_summary_stmt()).one())
+
+def get_student(session, student_id: int) -> Optional[StudentScore]:
+    """按ID取一条记录，不存在时返回 None"""
+    return session.get(StudentScore, student_id)
+
+def create_student(session, name: str, chinese, math, physics, chemistry) -> StudentScore:
+    """添加一条记录 (不提交)，返回的对象已分配ID"""
+    student = _new_student(name, chinese, math, physics, chemistry)
+    session.add(student)
+    session.flush()
+    return student
+
+def create_students(session, rows: Iterable[Sequence]) -> int:
+    """批量添加 (姓名, 语文, 数学, 物理, 化学) 行 (不提交)，返回行数"""
+    rows = _validated_rows(rows)
+    if rows:
+        session.connection().exec_driver_sql(INSERT_SQL, rows)
+    return len(rows)
+
+def remove_students(session, ids: Iterable[int]) -> int:
+    """按ID删除 (不提交，不重新编号)，返回删除的记录数"""
+    return session.execute(_delete_stmt(ids), execution_options={'synchronize_session': False}).rowcount
+
+# ---- 异步接口 ----
+
+async def fetch_page_async(session, page_size: int = 100, after_id: int = 0) -> list:
+    """fetch_page 的异步版本"""
+    return (await session.execute(_page_stmt(page_size, after_id))).all()
+
+async def summarize_async(session) -> Dict[str, object]:
+    """summarize 的异步版本"""
+    return _summary((await session.execute(_summary_stmt())).one())
+
+async def get_student_async(session, student_id: int) -> Optional[StudentScore]:
+    """get_student 的异步版本"""
+    return await session.get(StudentScore, student_id)
+
+async def create_student_async(session, name: str, chinese, math, physics, chemistry) -> StudentScore:
+    """create_student 的异步版本"""
+    student = _new_student(name, chinese, math, physics, chemistry)
+    session.add(student)
+    await session.flush()
+    return student
+
+async def create_students_async(session, rows: Iterable[Sequence]) -> int:
+    """create_students 的异步版本"""
+    rows = _validated_rows(rows)
+    if rows:
+        conn = await session.connection()
+        await conn.exec_driver_sql(INSERT_SQL, rows)
+    return len(rows)
+
+async def remove_students_async(session, ids: Iterable[int]) -> int:
+    """remove_students 的异步版本"""
+    result = await session.execute(_delete_stmt(ids), execution_options={'synchronize_session': False})
+    return result.rowcount
+
+# ---- 负载测试 ----
+
+def _random_row(rnd: random.Random) -> Tuple[str, int, int, int, int]:
+    return (f"学生{rnd.randrange(1000000)}", rnd.randint(40, 100), rnd.randint(40, 100),
+            rnd.randint(40, 100), rnd.randint(40, 100))
+
+async def _heartbeat(period: float, lags: List[float]) -> None:
+    """每 period 秒醒来一次，记录实际醒来时间比预期晚了多少 (事件循环被阻塞的时长)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + period
+        try:
+            await asyncio.sleep(period)
+        except asyncio.CancelledError:
+            # 一直没能醒来的最后一次也计入
+            lags.append(max(0.0, loop.time() - expected))
+            raise
+        lags.append(loop.time() - expected)
+
+async def load_test(path: str, requests: int = 2000, concurrency: int = 300, rows: int = 10000,
+                    blocking: bool = False) -> Dict[str, float]:
+    """对 path 发出 requests 个请求 (同时最多 concurrency 个)，返回吞吐量、延迟和事件循环延迟
+
+    请求按 列表 70% / 汇总 10% / 添加 15% / 删除 5% 混合。
+    blocking 为 True 时改为在协程中直接调用同步接口，作为阻塞事件循环的对照。
+    """
+    from db import AsyncDatabase, Database
+    sync_db = Database(f'sqlite:///{path}', pool_size=2)
+    create_schema(sync_db.engine)
+    rnd = random.Random(requests)
+    with sync_db.write_session() as session:
+        session.execute(delete(StudentScore))
+        create_students(session, (_random_row(rnd) for _ in range(rows)))
+    database = AsyncDatabase(f'sqlite+aiosqlite:///{path}', pool_size=10, max_overflow=0)
+
+    async def list_page() -> None:
+        after_id = rnd.randrange(rows)
+        if blocking:
+            with sync_db.read_session() as session:
+                fetch_page(session, 50, after_id)
+        else:
+            async with database.read_session() as session:
+                await fetch_page_async(session, 50, after_id)
+
+    async def summary() -> None:
+        if blocking:
+            with sync_db.read_session() as session:
+                summarize(session)
+        else:
+            async with database.read_session() as session:
+                await summarize_async(session)
+
+    async def add() -> None:
+        row = _random_row(rnd)
+        if blocking:
+            with sync_db.write_session() as session:
+                create_student(session, *row)
+        else:
+            async with database.write_session() as session:
+                await create_student_async(session, *row)
+
+    async def remove() -> None:
+        ids = [rnd.randrange(rows)]
+        if blocking:
+            with sync_db.write_session() as session:
+                remove_students(session, ids)
+        else:
+            async with database.write_session() as session:
+                await remove_students_async(session, ids)
+
+    kinds = [list_page] * 14 + [summary] * 2 + [add] * 3 + [remove]
+    latencies: List[float] = []
+    errors = 0
+    gate = asyncio.Semaphore(concurrency)
+
+    async def request(handler) -> None:
+        nonlocal errors
+        async with gate:
+            start = time.perf_counter()
+            try:
+                await handler()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    lags: List[float] = []
+    heartbeat = asyncio.ensure_future(_heartbeat(0.005, lags))
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(request(rnd.choice(kinds)) for _ in range(requests)))
+    finally:
+        elapsed = time.perf_counter() - start
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        await database.dispose()
+        sync_db.dispose()
+
+    ordered = sorted(latencies)
+    lags.sort()
+
+    def percentile(values: List[float], p: float) -> float:
+        if not values:
+            return math.nan
+        return values[min(len(values) - 1, int(p * len(values)))] * 1000
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed': elapsed,
+        'requests_per_sec': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_p50_ms': percentile(ordered, 0.50),
+        'latency_p99_ms': percentile(ordered, 0.99),
+        'latency_max_ms': ordered[-1] * 1000 if ordered else math.nan,
+        'heartbeats': len(lags),
+        'loop_lag_p99_ms': percentile(lags, 0.99),
+        'loop_lag_max_ms': lags[-1] * 1000 if lags else math.nan,
+    }
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口: 异步接口负载测试"""
+    parser = argparse.ArgumentParser(description="学生成绩异步接口负载测试")
+    parser.add_argument('--db', default=None, help="数据库文件，缺省使用临时文件 (会被清空)")
+    parser.add_argument('--rows', type=int, default=10000, help="初始记录数")
+    parser.add_argument('--requests', type=int, default=2000, help="请求总数")
+    parser.add_argument('--concurrency', type=int, default=300, help="同时进行的请求数")
+    parser.add_argument('--blocking', action='store_true', help="在协程中直接调用同步接口 (对照)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.db or os.path.join(workdir, 'students.db')
+        report = asyncio.run(load_test(path, args.requests, args.concurrency, args.rows, args.blocking))
+    print(f"请求 {report['requests']} 个, 错误 {report['errors']} 个, "
+          f"{report['requests_per_sec']:,.0f} 请求/秒")
+    print(f"请求延迟: p50 {report['latency_p50_ms']:.2f}ms, p99 {report['latency_p99_ms']:.2f}ms, "
+          f"最大 {report['latency_max_ms']:.2f}ms")
+    print(f"事件循环延迟: p99 {report['loop_lag_p99_ms']:.2f}ms, 最大 {report['loop_lag_max_ms']:.2f}ms "
+          f"(心跳 {report['heartbeats']} 次)")
+    return 1 if report['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,51 +1,41 @@
-from sqlalchemy import create_engine, Column, Integer, String
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import insert
 import sys
-# 创建基类
-Base = declarative_base()
+from db import Database
+from student_store import StudentScore, create_schema, create_student, remove_students
 
-# 定义数据模型
-class StudentScore(Base):
-    __tablename__ = 'student_scores'  # 数据库表名
-    
-    id = Column(Integer, primary_key=True, comment='编号')
-    name = Column(String(20), nullable=False, comment='姓名')
-    chinese = Column(Integer, comment='语文')
-    math = Column(Integer, comment='数学')
-    physics = Column(Integer, comment='物理')
-    chemistry = Column(Integer, comment='化学')
-
-    def __repr__(self):
-        return f"<Student {self.name}>"
+# 数据库在第一次使用时才打开 (连接池、WAL、busy_timeout 见 db.Database)，导入本模块不会修改 student.db
+database = None
 
-# 初始化数据库连接
-engine = create_engine('sqlite:///student.db', echo=False)
-Base.metadata.create_all(engine)
-
-# 创建会话工厂
-Session = sessionmaker(bind=engine)
-session = Session()
+def get_database() -> Database:
+    """返回共享的数据库对象，第一次调用时建表"""
+    global database
+    if database is None:
+        database = Database('sqlite:///student.db')
+        create_schema(database.engine)
+    return database
 
 # 添加初始数据
 def init_data():
+    # 以 Core executemany 一次插入，不创建 ORM 对象
     students = [
-        StudentScore(name='张三', chinese=85, math=90, physics=88, chemistry=92),
-        StudentScore(name='李四', chinese=78, math=85, physics=80, chemistry=85),
-        StudentScore(name='王五', chinese=92, math=88, physics=85, chemistry=90),
-        StudentScore(name='赵六', chinese=65, math=70, physics=75, chemistry=68),
-        StudentScore(name='陈七', chinese=88, math=92, physics=90, chemistry=94),
-        StudentScore(name='杨八', chinese=73, math=68, physics=72, chemistry=70),
-        StudentScore(name='周九', chinese=95, math=89, physics=91, chemistry=93),
-        StudentScore(name='吴十', chinese=81, math=77, physics=79, chemistry=83),
-        StudentScore(name='郑十一', chinese=69, math=73, physics=68, chemistry=71),
-        StudentScore(name='孙十二', chinese=87, math=84, physics=86, chemistry=89)
+        dict(name='张三', chinese=85, math=90, physics=88, chemistry=92),
+        dict(name='李四', chinese=78, math=85, physics=80, chemistry=85),
+        dict(name='王五', chinese=92, math=88, physics=85, chemistry=90),
+        dict(name='赵六', chinese=65, math=70, physics=75, chemistry=68),
+        dict(name='陈七', chinese=88, math=92, physics=90, chemistry=94),
+        dict(name='杨八', chinese=73, math=68, physics=72, chemistry=70),
+        dict(name='周九', chinese=95, math=89, physics=91, chemistry=93),
+        dict(name='吴十', chinese=81, math=77, physics=79, chemistry=83),
+        dict(name='郑十一', chinese=69, math=73, physics=68, chemistry=71),
+        dict(name='孙十二', chinese=87, math=84, physics=86, chemistry=89)
     ]
-    session.add_all(students)
-    session.commit()
+    with get_database().write_session() as session:
+        session.execute(insert(StudentScore.__table__), students)
 
 # 查询所有学生
 def show_all():
-    students = session.query(StudentScore).order_by(StudentScore.id).all()
+    with get_database().read_session() as session:
+        students = session.query(StudentScore).order_by(StudentScore.id).all()
     print("\n当前所有学生成绩：")
     print("{:<5}{:<8}{:<6}{:<6}{:<6}{:<6}".format(
         "ID", "姓名", "语文", "数学", "物理", "化学"))
@@ -62,36 +52,22 @@ def add_student():
     physics = int(input("物理："))
     chemistry = int(input("化学："))
     
-    new_student = StudentScore(
-        name=name,
-        chinese=chinese,
-        math=math,
-        physics=physics,
-        chemistry=chemistry
-    )
-    session.add(new_student)
-    session.commit()
+    with get_database().write_session() as session:
+        create_student(session, name, chinese, math, physics, chemistry)
     print("添加成功！")
 
 # 删除学生
 def delete_student():
     student_id = int(input("\n请输入要删除的学生ID："))
-    student = session.query(StudentScore).get(student_id)
-    if student:
-        session.delete(student)
-        session.commit()
+    with get_database().write_session() as session:
+        deleted = remove_students(session, [student_id])
+    if deleted:
         print(f"已删除ID为 {student_id} 的学生")
     else:
         print("未找到该学生")
 
 def main():
     """主程序"""
-    # 初始化数据库连接
-    engine = create_engine('sqlite:///student.db', echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
-
     try:
         while True:
             try:
@@ -104,11 +80,11 @@ def main():
                 choice = input("\n请选择操作(1-4): ").strip()
                 
                 if choice == '1':
-                    show_all(session)
+                    show_all()
                 elif choice == '2':
-                    add_student(session)
+                    add_student()
                 elif choice == '3':
-                    delete_student(session)
+                    delete_student()
                 elif choice == '4':
                     raise KeyboardInterrupt  # 触发退出
                 else:
@@ -123,7 +99,8 @@ def main():
         print("\n正在退出程序...")
     finally:
         print("正在关闭数据库连接...")
-        session.close()
+        if database is not None:
+            database.dispose()
         print("程序已退出！")
         sys.exit(0)
 
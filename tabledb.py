@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""热电偶分度表 SQLite 数据源
+
+从 thermocouple.db 的 thermo_types / thermo_data 表加载分度表。
+每种类型用一条按 (type_id, temp) 索引顺序扫描的查询取出全部数据点，
+索引由 import_tables 建立，加载时只读，不修改数据库文件；
+结果按数据库文件的修改时间和大小缓存，文件未变化时不再访问数据库。
+只使用标准库 sqlite3，不依赖 SQLAlchemy。
+
+用法:
+    python tabledb.py thermocouple_data.json thermocouple.db    把 JSON 分度表导入数据库
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+from array import array
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, Optional, Sequence, Tuple
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS thermo_types (
+        id INTEGER NOT NULL,
+        type_code VARCHAR(10) NOT NULL,
+        name VARCHAR(50) NOT NULL,
+        temp_min FLOAT,
+        temp_max FLOAT,
+        mv_min FLOAT,
+        mv_max FLOAT,
+        PRIMARY KEY (id),
+        UNIQUE (type_code)
+    )""",
+    """CREATE TABLE IF NOT EXISTS thermo_data (
+        id INTEGER NOT NULL,
+        type_id INTEGER,
+        "temp" FLOAT,
+        mv FLOAT,
+        PRIMARY KEY (id),
+        FOREIGN KEY(type_id) REFERENCES thermo_types (id)
+    )""",
+)
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ix_thermo_data_type_temp ON thermo_data (type_id, "temp")',
+    'CREATE INDEX IF NOT EXISTS ix_thermo_data_type_mv ON thermo_data (type_id, mv)',
+)
+
+# (路径, 类型, 温度范围) -> ((mtime_ns, size, ...), 类型字典)
+_cache: Dict[Tuple, Tuple[Tuple, Dict[str, Dict]]] = {}
+
+def _signature(path: str) -> Tuple:
+    """数据库文件(含 WAL 文件)的修改时间和大小，用于判断缓存是否失效"""
+    signature = []
+    for name in (path, path + '-wal'):
+        try:
+            st = os.stat(name)
+        except FileNotFoundError:
+            continue
+        signature += [st.st_mtime_ns, st.st_size]
+    return tuple(signature)
+
+def ensure_indexes(conn: sqlite3.Connection) -> None:
+    """创建 (type_id, temp) 和 (type_id, mv) 复合索引"""
+    for sql in INDEXES:
+        conn.execute(sql)
+    conn.commit()
+
+def import_tables(types: Dict[str, Dict], path) -> int:
+    """把 JSON 结构的分度表写入数据库，已有的同类型数据被替换，返回写入的点数"""
+    conn = sqlite3.connect(os.fspath(path))
+    try:
+        with conn:
+            for sql in SCHEMA:
+                conn.execute(sql)
+            total = 0
+            for code, info in types.items():
+                range_data = info['range']
+                row = conn.execute('SELECT id FROM thermo_types WHERE type_code = ?', (code,)).fetchone()
+                if row is None:
+                    type_id = conn.execute(
+                        'INSERT INTO thermo_types (type_code, name, temp_min, temp_max, mv_min, mv_max) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        (code, info.get('name', code), range_data['temp_min'], range_data['temp_max'],
+                         range_data['mv_min'], range_data['mv_max'])).lastrowid
+                else:
+                    type_id = row[0]
+                    conn.execute(
+                        'UPDATE thermo_types SET name = ?, temp_min = ?, temp_max = ?, mv_min = ?, mv_max = ? '
+                        'WHERE id = ?',
+                        (info.get('name', code), range_data['temp_min'], range_data['temp_max'],
+                         range_data['mv_min'], range_data['mv_max'], type_id))
+                    conn.execute('DELETE FROM thermo_data WHERE type_id = ?', (type_id,))
+                conn.executemany(
+                    'INSERT INTO thermo_data (type_id, "temp", mv) VALUES (?, ?, ?)',
+                    ((type_id, float(p['temp']), float(p['mv'])) for p in info['data']))
+                total += len(info['data'])
+        ensure_indexes(conn)
+    finally:
+        conn.close()
+    return total
+
+def _load_type(conn: sqlite3.Connection, type_id: int,
+               temp_range: Optional[Tuple[float, float]]) -> Tuple[array, array]:
+    """一条查询取出一种类型的数据点
+
+    指定 temp_range 时只取覆盖该温度区间的数据段，两端各多取一个断点，
+    保证区间端点仍能插值。
+    """
+    if temp_range is None:
+        rows = conn.execute(
+            'SELECT "temp", mv FROM thermo_data WHERE type_id = ? ORDER BY "temp"', (type_id,)).fetchall()
+    else:
+        low, high = temp_range
+        rows = conn.execute(
+            'SELECT "temp", mv FROM thermo_data WHERE type_id = :id '
+            'AND "temp" >= coalesce((SELECT max("temp") FROM thermo_data '
+            '                        WHERE type_id = :id AND "temp" <= :low), :low) '
+            'AND "temp" <= coalesce((SELECT min("temp") FROM thermo_data '
+            '                        WHERE type_id = :id AND "temp" >= :high), :high) '
+            'ORDER BY "temp"',
+            {'id': type_id, 'low': low, 'high': high}).fetchall()
+    temps = array('d', [r[0] for r in rows])
+    mvs = array('d', [r[1] for r in rows])
+    return temps, mvs
+
+def load_tables(path, types: Optional[Sequence[str]] = None,
+                temp_range: Optional[Tuple[float, float]] = None, use_cache: bool = True) -> Dict[str, Dict]:
+    """从数据库加载分度表
+
+    返回与 tablefile.load_tables 相同结构的类型字典，数据点以 'temps'、'mvs'
+    两列 array('d') 给出。types 限定加载的类型代码；temp_range 为 (下限, 上限)
+    时只加载该温度段，'range' 相应收窄到实际加载的数据段。
+    """
+    path = os.path.abspath(os.fspath(path))
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"文件不存在: {path}")
+    if temp_range is not None and temp_range[0] > temp_range[1]:
+        raise ValueError("温度范围下限不能大于上限")
+    key = (path, tuple(types) if types is not None else None,
+           tuple(temp_range) if temp_range is not None else None)
+    signature = _signature(path)
+    cached = _cache.get(key)
+    if use_cache and cached is not None and cached[0] == signature:
+        return cached[1]
+
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(
+            'SELECT id, type_code, name, temp_min, temp_max, mv_min, mv_max FROM thermo_types ORDER BY id').fetchall()
+        result = {}
+        for type_id, code, name, temp_min, temp_max, mv_min, mv_max in rows:
+            if types is not None and code not in types:
+                continue
+            temps, mvs = _load_type(conn, type_id, temp_range)
+            if len(temps) < 2:
+                if temp_range is None:
+                    raise ValueError(f"{code} 型分度表数据点不足")
+                continue  # 该类型不覆盖所请求的温度段
+            if temp_range is not None:
+                temp_min, temp_max = max(temp_min, temps[0]), min(temp_max, temps[-1])
+                mv_min, mv_max = max(mv_min, min(mvs)), min(mv_max, max(mvs))
+            result[code] = {
+                'name': name,
+                'range': {'temp_min': temp_min, 'temp_max': temp_max, 'mv_min': mv_min, 'mv_max': mv_max},
+                'temps': temps,
+                'mvs': mvs,
+            }
+    finally:
+        conn.close()
+    if not result:
+        raise ValueError("数据库中没有可用的分度表数据")
+    _cache[key] = (signature, result)
+    return result
+
+def clear_cache() -> None:
+    """清空加载缓存"""
+    _cache.clear()
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口: JSON -> SQLite 分度表"""
+    args = list(sys.argv[1:] if argv is None else argv)
+    if len(args) not in (1, 2):
+        print("用法: python tabledb.py <JSON文件> [数据库文件]")
+        return 2
+    import json
+    source = args[0]
+    target = args[1] if len(args) == 2 else 'thermocouple.db'
+    with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+        data = json.load(f)
+    if 'types' not in data:
+        print("数据格式错误：缺少类型数据")
+        return 1
+    total = import_tables(data['types'], target)
+    print(f"已写入 {target}: {len(data['types'])} 种类型, {total} 个数据点")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
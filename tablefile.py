@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""热电偶分度表二进制格式
+
+JSON 仍是分度表的源格式，本模块把它转换为紧凑的二进制文件，
+加载时用 mmap 映射文件，直接在映射的缓冲区上插值，不解析也不复制数据。
+
+文件布局 (小端):
+    文件头   magic 'TCTB', 版本号 u16, 类型数 u16
+    目录项   每种类型一项: 类型代码 8s, 名称 32s (UTF-8),
+             temp_min/temp_max/mv_min/mv_max 4 个 f64, 数据偏移 u64, 点数 u32, 保留 4 字节
+    数据区   每种类型依次存放 点数 个温度 f64 和 点数 个热电势 f64，按温度升序
+
+用法:
+    python tablefile.py thermocouple_data.json thermocouple_data.tctb
+"""
+
+from __future__ import annotations
+
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from compat import get_numpy
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, Optional, Sequence
+
+MAGIC = b'TCTB'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sHH')
+DIRECTORY_ENTRY = struct.Struct('<8s32s4dQI4x')
+
+class BufferTable:
+    """直接在只读缓冲区上插值的分段线性查找表
+
+    xs、ys 可以是 mmap 上的 memoryview，查找时按需计算区间增量，
+    结果与 SegmentTable 逐位一致。
+    """
+    __slots__ = ('xs', 'ys', '_arrays')
+
+    def __init__(self, xs: Sequence[float], ys: Sequence[float]):
+        if len(xs) != len(ys) or len(xs) < 2:
+            raise ValueError("分度表至少需要两个断点")
+        self.xs = xs
+        self.ys = ys
+        self._arrays = None
+
+    def __reduce__(self):
+        # memoryview 不能 pickle，发送到子进程时复制为数组
+        return (BufferTable, (array('d', self.xs), array('d', self.ys)))
+
+    def lookup(self, x: float) -> Optional[float]:
+        """二分查找所在区间并线性插值，超出断点范围时返回 None"""
+        xs, ys = self.xs, self.ys
+        if not xs[0] <= x <= xs[-1]:
+            return None
+        i = bisect_left(xs, x) - 1
+        if i < 0:
+            i = 0
+        x0, y0 = xs[i], ys[i]
+        return y0 + (x - x0) * (ys[i + 1] - y0) / (xs[i + 1] - x0)
+
+    def lookup_many(self, values):
+        """批量查找，超出断点范围的位置为 NaN"""
+        np = get_numpy()
+        if np is None:
+            nan = math.nan
+            result = []
+            for x in values:
+                y = self.lookup(x)
+                result.append(nan if y is None else y)
+            return result
+
+        if self._arrays is None:
+            # frombuffer 只创建视图，不复制映射的数据
+            self._arrays = (np.frombuffer(self.xs, dtype=float), np.frombuffer(self.ys, dtype=float))
+        xs, ys = self._arrays
+        x = np.asarray(values, dtype=float)
+        i = np.searchsorted(xs, x, side='left') - 1
+        np.clip(i, 0, len(xs) - 2, out=i)
+        x0, y0 = xs[i], ys[i]
+        y = y0 + (x - x0) * (ys[i + 1] - y0) / (xs[i + 1] - x0)
+        y[~((x >= xs[0]) & (x <= xs[-1]))] = np.nan
+        return y
+
+def _encode_text(text: str, size: int) -> bytes:
+    """按 UTF-8 编码并截断到 size 字节以内，不切断多字节字符"""
+    data = text.encode('utf-8')[:size]
+    return data.decode('utf-8', errors='ignore').encode('utf-8')
+
+def write_tables(types: Dict[str, Dict], path) -> None:
+    """把 JSON 结构的分度表写为二进制文件"""
+    entries = []
+    blobs = []
+    offset = FILE_HEADER.size + DIRECTORY_ENTRY.size * len(types)
+    for code, info in types.items():
+        points = sorted(info['data'], key=lambda p: p['temp'])
+        temps = [float(p['temp']) for p in points]
+        mvs = [float(p['mv']) for p in points]
+        blob = struct.pack(f'<{len(temps)}d', *temps) + struct.pack(f'<{len(mvs)}d', *mvs)
+        range_data = info['range']
+        entries.append(DIRECTORY_ENTRY.pack(
+            _encode_text(code, 8), _encode_text(info.get('name', code), 32),
+            range_data['temp_min'], range_data['temp_max'], range_data['mv_min'], range_data['mv_max'],
+            offset, len(points)))
+        blobs.append(blob)
+        offset += len(blob)
+    with open(path, 'wb') as f:
+        f.write(FILE_HEADER.pack(MAGIC, VERSION, len(types)))
+        f.writelines(entries)
+        f.writelines(blobs)
+
+def load_tables(path) -> Dict[str, Dict]:
+    """内存映射加载二进制分度表
+
+    返回与 JSON 相同结构的类型字典，只是数据点以 'temps'、'mvs' 两列
+    memoryview 给出 (直接指向映射区，不复制)。
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(buffer)
+    if len(view) < FILE_HEADER.size:
+        raise ValueError("二进制分度表文件过短")
+    magic, version, count = FILE_HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("不是二进制分度表文件")
+    if version != VERSION:
+        raise ValueError(f"不支持的二进制分度表版本: {version}")
+
+    types = {}
+    for index in range(count):
+        code, name, temp_min, temp_max, mv_min, mv_max, offset, points = DIRECTORY_ENTRY.unpack_from(
+            view, FILE_HEADER.size + index * DIRECTORY_ENTRY.size)
+        end = offset + 16 * points
+        if end > len(view):
+            raise ValueError("二进制分度表数据不完整")
+        code = code.rstrip(b'\0').decode('utf-8')
+        temps = view[offset:offset + 8 * points].cast('d')
+        mvs = view[offset + 8 * points:end].cast('d')
+        if sys.byteorder != 'little':
+            # 大端平台无法直接映射，退化为复制并转换字节序
+            temps, mvs = array('d', temps), array('d', mvs)
+            temps.byteswap()
+            mvs.byteswap()
+        types[code] = {
+            'name': name.rstrip(b'\0').decode('utf-8', errors='ignore'),
+            'range': {'temp_min': temp_min, 'temp_max': temp_max, 'mv_min': mv_min, 'mv_max': mv_max},
+            'temps': temps,
+            'mvs': mvs,
+        }
+    return types
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口: JSON -> 二进制分度表"""
+    args = list(sys.argv[1:] if argv is None else argv)
+    if len(args) not in (1, 2):
+        print("用法: python tablefile.py <JSON文件> [输出文件]")
+        return 2
+    import json
+    source = args[0]
+    target = args[1] if len(args) == 2 else os.path.splitext(source)[0] + '.tctb'
+    with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+        data = json.load(f)
+    if 'types' not in data:
+        print("数据格式错误：缺少类型数据")
+        return 1
+    write_tables(data['types'], target)
+    print(f"已写入 {target}: {len(data['types'])} 种类型, {os.path.getsize(target)} 字节")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""热电偶数据流式转换
+
+从文件或标准输入按行读取 CSV/逐行数值，分块批量转换后立即写出，
+内存占用与输入文件大小无关。
+
+用法示例:
+    python te_stream.py logger.csv --types=-,K,K,E --header -o result.csv
+    cat readings.txt | python te_stream.py -t S -d t2mv
+"""
+
+import argparse
+import contextlib
+import csv
+import math
+import sys
+import time
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence, TextIO
+
+from thermo_core import KTypeConverter, ENGINES
+
+PASS_THROUGH = '-'
+
+def read_rows(stream: TextIO, delimiter: str = ',') -> Iterator[List[str]]:
+    """逐行读取输入，跳过空行"""
+    for row in csv.reader(stream, delimiter=delimiter):
+        if row:
+            yield row
+
+def chunked(rows: Iterable[List[str]], size: int) -> Iterator[List[List[str]]]:
+    """把行流切分为固定大小的块"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def parse_float(cell: str) -> float:
+    """解析数值，无法解析的单元格记为 NaN"""
+    try:
+        return float(cell)
+    except ValueError:
+        return math.nan
+
+def convert_chunks(chunks: Iterable[List[List[str]]], converter: KTypeConverter,
+                   types: Sequence[str], direction: str = 'mv2t',
+                   precision: int = 3) -> Iterator[List[List[str]]]:
+    """按列类型批量转换每个数据块
+
+    types 按列给出热电偶类型，'-' 表示该列原样输出；只给一个类型时
+    应用于所有列。超出范围或无法解析的值输出为空。
+    """
+    if direction not in ('mv2t', 't2mv'):
+        raise ValueError(f"不支持的转换方向: {direction}")
+    for chunk in chunks:
+        width = max(len(row) for row in chunk)
+        columns = []
+        for col in range(width):
+            type_name = types[0] if len(types) == 1 else (types[col] if col < len(types) else PASS_THROUGH)
+            cells = [row[col] if col < len(row) else '' for row in chunk]
+            if type_name == PASS_THROUGH:
+                columns.append(cells)
+                continue
+            type_converter = converter.get_converter(type_name)
+            values = [parse_float(cell) for cell in cells]
+            if direction == 'mv2t':
+                results = type_converter.mv_to_temp_many(values)
+            else:
+                results = type_converter.temp_to_mv_many(values)
+            columns.append(['' if math.isnan(v) else f"{v:.{precision}f}" for v in results])
+        yield [list(row) for row in zip(*columns)]
+
+def write_rows(chunks: Iterable[List[List[str]]], stream: TextIO, delimiter: str = ',') -> int:
+    """写出转换结果，返回写出的行数"""
+    writer = csv.writer(stream, delimiter=delimiter, lineterminator='\n')
+    count = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="热电偶数据流式转换")
+    parser.add_argument('input', nargs='?', default='-', help="输入文件，缺省或 '-' 表示标准输入")
+    parser.add_argument('-o', '--output', default='-', help="输出文件，缺省为标准输出")
+    parser.add_argument('-t', '--types', default='K',
+                        help="逐列热电偶类型，逗号分隔，'-' 表示原样输出 (默认 K)")
+    parser.add_argument('-d', '--direction', choices=['mv2t', 't2mv'], default='mv2t',
+                        help="mv2t: 热电势→温度 (默认); t2mv: 温度→热电势")
+    parser.add_argument('-e', '--engine', choices=sorted(ENGINES), default='table', help="转换引擎")
+    parser.add_argument('--data-file', default=None, help="分度表文件 (.json 或 .tctb)，缺省为程序自带的 JSON")
+    parser.add_argument('--delimiter', default=',', help="列分隔符")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="每批转换的行数")
+    parser.add_argument('--precision', type=int, default=3, help="输出小数位数")
+    parser.add_argument('--header', action='store_true', help="第一行为表头，原样输出")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size 必须大于0")
+    types = [t.strip() for t in args.types.split(',')]
+
+    # 加载信息打印到标准错误，避免混入标准输出的转换结果
+    with contextlib.redirect_stdout(sys.stderr):
+        converter = KTypeConverter(engine=args.engine, data_file=args.data_file)
+    for type_name in types:
+        if type_name != PASS_THROUGH:
+            converter.get_converter(type_name)
+
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', newline='')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    start = time.perf_counter()
+    try:
+        rows = read_rows(source, args.delimiter)
+        if args.header:
+            header = next(rows, None)
+            if header is not None:
+                csv.writer(target, delimiter=args.delimiter, lineterminator='\n').writerow(header)
+        chunks = convert_chunks(chunked(rows, args.chunk_size), converter, types,
+                                args.direction, args.precision)
+        count = write_rows(chunks, target, args.delimiter)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else float('inf')
+    print(f"已转换 {count} 行, 耗时 {elapsed:.3f} 秒, {rate:,.0f} 行/秒", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"转换失败: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""rollup 增量聚合与查询的测试 (python -m pytest test_rollup.py)"""
+
+import random
+import sqlite3
+
+import pytest
+from sqlalchemy import insert
+
+from rollup import Reading, RollupEngine
+
+BASE = 1_700_000_000
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'readings.db'
+
+@pytest.fixture
+def engine(path):
+    """约 10 小时的单通道读数，间隔 7.3 秒，每 50 条有一条超出范围 (NULL)"""
+    engine = RollupEngine(path, chunk_size=1000)
+    rnd = random.Random(1)
+    with engine.engine.begin() as conn:
+        conn.execute(insert(Reading.__table__), [
+            {'channel': 'a', 'ts': BASE + i * 7.3, 'temp': rnd.uniform(0, 100) if i % 50 else None}
+            for i in range(5000)])
+    yield engine
+    engine.close()
+
+def raw_buckets(path, start, end, step):
+    """直接扫描原始读数得到的 (起点, 个数, 均值, 最小, 最大)"""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(
+            'SELECT CAST(ts / ? AS INTEGER) * ? AS s, count(temp), avg(temp), min(temp), max(temp) '
+            'FROM readings WHERE channel = ? AND ts >= ? AND ts < ? GROUP BY s ORDER BY s',
+            (step, step, 'a', start, end)).fetchall()
+    finally:
+        conn.close()
+    return [(int(s), n, mean, low, high) for s, n, mean, low, high in rows]
+
+def assert_matches_raw(engine, path, start, end, step, resolution):
+    used, buckets = engine.query('a', start, end, step)
+    assert used == resolution
+    expected = raw_buckets(path, start, end, step)
+    assert [(b.start, b.count, b.min, b.max) for b in buckets] == [(s, n, lo, hi) for s, n, _, lo, hi in expected]
+    for bucket, (_, _, mean, _, _) in zip(buckets, expected):
+        assert bucket.mean == pytest.approx(mean)
+
+@pytest.mark.parametrize('start, end, step, resolution', [
+    (BASE // 3600 * 3600, BASE // 3600 * 3600 + 36000, 3600, 3600),
+    (BASE // 60 * 60, BASE // 60 * 60 + 3000, 60, 60),
+])
+def test_query_aligned_range_matches_raw(engine, path, start, end, step, resolution):
+    assert_matches_raw(engine, path, start, end, step, resolution)
+
+@pytest.mark.parametrize('start, end, step, resolution', [
+    (BASE + 800, BASE + 30000, 3600, 3600),
+    (BASE + 13, BASE + 2000.5, 60, 60),
+    (BASE + 100, BASE + 20000, 120, 60),
+    (BASE + 5, BASE + 50, 60, 0),
+])
+def test_query_unaligned_range_matches_raw(engine, path, start, end, step, resolution):
+    assert_matches_raw(engine, path, start, end, step, resolution)
+
+def insert_readings(engine, ids, ts=BASE, temp=1.0):
+    with engine.engine.begin() as conn:
+        conn.execute(insert(Reading.__table__),
+                     [{'id': i, 'channel': 'b', 'ts': ts + i, 'temp': temp} for i in ids])
+
+def total_count(engine):
+    """1m 和 1h 两级聚合中通道 b 的读数总数"""
+    _, minutes = engine.query('b', BASE, BASE + 10 ** 6, 60, refresh=False)
+    _, hours = engine.query('b', BASE // 3600 * 3600, BASE // 3600 * 3600 + 3600 * 300, 3600, refresh=False)
+    return sum(b.count for b in minutes), sum(b.count for b in hours)
+
+def test_update_crosses_id_gap_wider_than_chunk(path):
+    with RollupEngine(path, chunk_size=10) as engine:
+        # id 空洞 (100 以上) 远大于 chunk_size
+        insert_readings(engine, list(range(1, 26)) + list(range(1000, 1013)))
+        assert engine.update() == 38
+        assert engine.update() == 0
+        insert_readings(engine, [50000])
+        assert engine.update() == 1
+        assert total_count(engine) == (39, 39)
+
+def test_update_is_incremental(path):
+    with RollupEngine(path, chunk_size=7) as engine:
+        insert_readings(engine, range(1, 31))
+        assert engine.update() == 30
+        insert_readings(engine, range(31, 41), temp=3.0)
+        assert engine.update() == 10
+        assert engine.update() == 0
+        assert total_count(engine) == (40, 40)
+        _, buckets = engine.query('b', BASE, BASE + 60 * 100, 3600 * 1000, refresh=False)
+        assert buckets[0].mean == pytest.approx((30 * 1.0 + 10 * 3.0) / 40)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""sqdata 批量删除、稳定ID和百分位数的测试 (python -m pytest test_sqdata.py)"""
+
+import pytest
+from sqlalchemy import insert, select
+
+import sqdata
+from db import Database
+from student_store import StudentScore, create_schema
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """临时库: 学生1-10，四科成绩和平均分都是 10*i"""
+    database = Database(f'sqlite:///{tmp_path / "student.db"}')
+    create_schema(database.engine)
+    with database.write_session() as session:
+        session.execute(insert(StudentScore.__table__), [
+            dict(name=f'学生{i}', chinese=10 * i, math=10 * i, physics=10 * i, chemistry=10 * i)
+            for i in range(1, 11)])
+    monkeypatch.setattr(sqdata, 'database', database)
+    monkeypatch.setattr(sqdata, 'stable_ids', False)
+    yield database
+    database.dispose()
+
+def rows(database):
+    """按ID排列的 (ID, 姓名)"""
+    with database.read_session() as session:
+        return session.execute(select(StudentScore.id, StudentScore.name).order_by(StudentScore.id)).all()
+
+def next_id(database):
+    """新插入记录得到的ID"""
+    with database.write_session() as session:
+        session.execute(insert(StudentScore.__table__),
+                        dict(name='新生', chinese=60, math=60, physics=60, chemistry=60))
+    return rows(database)[-1][0]
+
+def test_delete_middle_id_keeps_ids_contiguous(db):
+    assert sqdata.delete_students(ids=[5]) == 1
+    result = rows(db)
+    assert [r[0] for r in result] == list(range(1, 10))
+    assert [r[1] for r in result] == [f'学生{i}' for i in (1, 2, 3, 4, 6, 7, 8, 9, 10)]
+    assert next_id(db) == 10
+
+def test_delete_id_list(db):
+    assert sqdata.delete_students(ids=[2, 7, 9]) == 3
+    result = rows(db)
+    assert [r[0] for r in result] == list(range(1, 8))
+    assert [r[1] for r in result] == [f'学生{i}' for i in (1, 3, 4, 5, 6, 8, 10)]
+    assert next_id(db) == 8
+
+def test_delete_id_range(db):
+    assert sqdata.delete_students(id_range=(3, 6)) == 4
+    result = rows(db)
+    assert [r[0] for r in result] == list(range(1, 7))
+    assert [r[1] for r in result] == [f'学生{i}' for i in (1, 2, 7, 8, 9, 10)]
+    assert next_id(db) == 7
+
+def test_delete_missing_id_is_noop(db):
+    before = rows(db)
+    assert sqdata.delete_students(ids=[42]) == 0
+    assert sqdata.delete_students(id_range=(20, 30)) == 0
+    assert rows(db) == before
+
+def test_delete_needs_ids_or_range(db):
+    with pytest.raises(ValueError):
+        sqdata.delete_students()
+    with pytest.raises(ValueError):
+        sqdata.delete_students(ids=[1], id_range=(1, 2))
+
+def test_stable_ids_rank_to_id(db, monkeypatch):
+    monkeypatch.setattr(sqdata, 'stable_ids', True)
+    assert sqdata.delete_students(ids=[2, 5]) == 2
+    assert [r[0] for r in rows(db)] == [1, 3, 4, 6, 7, 8, 9, 10]
+    assert [sqdata.display_rank_to_id(rank) for rank in range(1, 9)] == [1, 3, 4, 6, 7, 8, 9, 10]
+    assert sqdata.display_rank_to_id(0) is None
+    assert sqdata.display_rank_to_id(9) is None
+
+@pytest.mark.parametrize('p, expected', [(0, 10), (50, 50), (100, 100)])
+def test_percentile_nearest_rank(db, p, expected):
+    assert sqdata.percentile(p) == expected
+
+def test_percentile_empty_and_out_of_range(db):
+    with pytest.raises(ValueError):
+        sqdata.percentile(101)
+    sqdata.delete_students(id_range=(1, 10))
+    assert sqdata.percentile(50) is None
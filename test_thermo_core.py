@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""thermo_core 转换引擎的测试 (python -m pytest test_thermo_core.py)"""
+
+import math
+
+import pytest
+
+from thermo_core import KTypeConverter, MonotoneCubicTable, SegmentTable, UniformGrid
+
+np = pytest.importorskip('numpy')
+
+@pytest.fixture(scope='module')
+def converter():
+    return KTypeConverter()
+
+@pytest.fixture(scope='module')
+def k_type(converter):
+    return converter.get_converter('K')
+
+def test_cjc_matches_single_conversion(k_type):
+    mvs = [-1.0, 0.0, 1.0, 10.0, 40.0]
+    expected = [k_type.mv_to_temp_cjc(mv, 25.0) for mv in mvs]
+    assert k_type.mv_to_temp_cjc_many(mvs, 25.0).tolist() == expected
+    assert k_type.mv_to_temp_cjc_many(mvs, [25.0] * len(mvs)).tolist() == expected
+
+def test_cjc_out_of_range_is_nan(k_type):
+    low, high = k_type.temp_bounds
+    temps = k_type.mv_to_temp_cjc_many([1.0, 1.0], [25.0, high + 100])
+    assert not math.isnan(temps[0]) and math.isnan(temps[1])
+    assert np.isnan(k_type.mv_to_temp_cjc_many([1.0, 2.0], low - 100)).all()
+
+@pytest.mark.parametrize('cj_temp', [25, 25.0, np.float64(25), np.float32(25), np.int64(25), np.array(25.0)])
+def test_cjc_scalar_reference_types(k_type, cj_temp):
+    mvs = [1.0, 2.0, 3.0]
+    assert k_type.mv_to_temp_cjc_many(mvs, cj_temp).tolist() == k_type.mv_to_temp_cjc_many(mvs, 25.0).tolist()
+
+def test_cjc_length_mismatch(k_type):
+    with pytest.raises(ValueError):
+        k_type.mv_to_temp_cjc_many([1.0, 2.0], [25.0, 25.0, 25.0])
+
+def linear_scan(data, x_key, y_key, x):
+    """原来的逐段扫描线性插值 (SegmentTable 之前的实现)"""
+    for i in range(len(data) - 1):
+        x1, x2 = data[i][x_key], data[i + 1][x_key]
+        if x1 <= x <= x2:
+            y1, y2 = data[i][y_key], data[i + 1][y_key]
+            return y1 + (x - x1) * (y2 - y1) / (x2 - x1)
+    return None
+
+def sample_points(data, key, count=500):
+    """断点、段中点和等间距点"""
+    xs = [p[key] for p in data]
+    points = xs + [(a + b) / 2 for a, b in zip(xs, xs[1:])]
+    low, high = xs[0], xs[-1]
+    points += [low + (high - low) * i / count for i in range(count + 1)]
+    return points
+
+@pytest.mark.parametrize('x_key, y_key', [('temp', 'mv'), ('mv', 'temp')])
+def test_segment_table_matches_linear_scan(converter, x_key, y_key):
+    for info in converter.types.values():
+        data = info['data']
+        table = SegmentTable.from_points(data, x_key, y_key)
+        points = sample_points(data, x_key)
+        expected = [linear_scan(data, x_key, y_key, x) for x in points]
+        # 逐位一致，不是近似相等
+        assert [table.lookup(x) for x in points] == expected
+        assert table.lookup_many(points).tolist() == expected
+
+def test_segment_table_out_of_range(converter):
+    data = converter.types['K']['data']
+    table = SegmentTable.from_points(data, 'temp', 'mv')
+    assert table.lookup(data[0]['temp'] - 1) is None
+    assert table.lookup(data[-1]['temp'] + 1) is None
+    assert np.isnan(table.lookup_many([data[0]['temp'] - 1, data[-1]['temp'] + 1])).all()
+
+@pytest.mark.parametrize('step', [1.0, 7.0, 40.0, 0.3])
+def test_grid_exact_on_linear_source(step):
+    """直线重采样后处处精确，包括范围不是步长整数倍时较窄的最后一个单元"""
+    grid = UniformGrid.resample(SegmentTable([0.0, 10.0], [1.0, 21.0]), 0.0, 10.0, step)
+    xs = [10.0 * i / 97 for i in range(98)] + [10.0 - step / 4, 10.0]
+    for x in xs:
+        assert grid.lookup(x) == pytest.approx(2 * x + 1, abs=1e-12)
+    assert grid.lookup_many(xs).tolist() == pytest.approx([2 * x + 1 for x in xs], abs=1e-12)
+    assert grid.lookup(10.0 + 1e-6) is None and grid.lookup(-1e-6) is None
+
+@pytest.mark.parametrize('temp_step', [7.0, 40.0])
+def test_grid_endpoints_match_table(temp_step):
+    table = KTypeConverter()
+    grid = KTypeConverter(engine='grid', temp_step=temp_step)
+    for name, conv in grid.converters.items():
+        source = table.converters[name]
+        for temp in conv.temp_bounds:
+            expected = source.forward.lookup(temp)
+            assert conv.forward.lookup(temp) == pytest.approx(expected, abs=1e-12)
+            assert conv.forward.lookup_many([temp])[0] == pytest.approx(expected, abs=1e-12)
+        for mv in conv.mv_bounds:
+            assert conv.inverse.lookup(mv) == pytest.approx(source.inverse.lookup(mv), abs=1e-9)
+
+def test_grid_report_error_bounds():
+    grid = KTypeConverter(engine='grid', temp_step=40.0)
+    fine = KTypeConverter(engine='grid', temp_step=1.0)
+    report, fine_report = grid.grid_report(), fine.grid_report()
+    for name, row in report.items():
+        assert row['memory_bytes'] == 8 * (row['temp_points'] + row['mv_points'])
+        assert fine_report[name]['max_error_mv'] <= row['max_error_mv']
+        # 报告的最大误差覆盖实际误差 (在各单元中点附近抽查)
+        conv, source = grid.converters[name], KTypeConverter().converters[name]
+        low, high = conv.temp_bounds
+        worst = max(abs(conv.forward.lookup(t) - source.forward.lookup(t))
+                    for t in (low + (high - low) * i / 1000 for i in range(1001)))
+        assert worst <= row['max_error_mv'] + 1e-12
+
+@pytest.fixture(scope='module')
+def pchip():
+    return KTypeConverter(engine='pchip')
+
+def test_pchip_passes_through_breakpoints(pchip):
+    for name, conv in pchip.converters.items():
+        for point in pchip.types[name]['data']:
+            assert conv.forward.lookup(point['temp']) == pytest.approx(point['mv'], abs=1e-12)
+
+def test_pchip_monotone(pchip):
+    for conv in pchip.converters.values():
+        low, high = conv.temp_bounds
+        mvs = conv.forward.lookup_many([low + (high - low) * i / 5000 for i in range(5001)])
+        assert (np.diff(mvs) > 0).all()
+
+# 各类型温度→热电势→温度往返的最大误差上限 (°C)，实测约 K 0.009 / E 0.06 / S 0.12
+ROUND_TRIP_LIMIT = {'K': 0.02, 'E': 0.1, 'S': 0.2}
+
+def test_pchip_round_trip(pchip):
+    for name, conv in pchip.converters.items():
+        low, high = conv.temp_bounds
+        temps = [low + (high - low) * i / 2000 for i in range(2001)]
+        back = [conv.inverse.lookup(conv.forward.lookup(t)) for t in temps]
+        assert max(abs(b - t) for b, t in zip(back, temps)) <= ROUND_TRIP_LIMIT[name]
+        assert conv.inverse.lookup_many(conv.forward.lookup_many(temps)).tolist() == pytest.approx(back, abs=1e-12)
+
+def test_pchip_inverse_density_improves_round_trip(pchip):
+    data = pchip.types['S']['data']
+    forward = MonotoneCubicTable.from_points(data, 'temp', 'mv')
+    temps = [data[0]['temp'] + (data[-1]['temp'] - data[0]['temp']) * i / 500 for i in range(501)]
+
+    def worst(inverse):
+        return max(abs(inverse.lookup(forward.lookup(t)) - t) for t in temps)
+
+    assert worst(forward.inverse(16)) < worst(forward.inverse(1)) / 10
+    with pytest.raises(ValueError):
+        forward.inverse(0)
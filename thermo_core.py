@@ -0,0 +1,904 @@
+# -*- coding: utf-8 -*-
+"""热电偶转换核心
+
+不依赖 tkinter 的转换逻辑，供界面、命令行工具和后台服务共用。
+导入时只加载标准库的轻量模块，numpy 在第一次批量转换时才导入。
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+import its90
+from compat import get_numpy
+
+# 类型注解只在静态检查时导入 typing，运行时不导入以缩短启动时间
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Optional, Dict, List, Sequence, Tuple
+
+class SegmentTable:
+    """预编译的分段线性查找表
+
+    断点按自变量升序保存为平行数组，并预先计算每一段的起点和增量，
+    查找时二分定位区间，不再逐段遍历字典列表。
+    """
+    __slots__ = ('xs', 'x0', 'y0', 'dx', 'dy', '_arrays')
+
+    def __init__(self, xs: Sequence[float], ys: Sequence[float]):
+        if len(xs) != len(ys) or len(xs) < 2:
+            raise ValueError("分度表至少需要两个断点")
+        self.xs: List[float] = list(xs)
+        # 第 i 段: y = y0[i] + (x - x0[i]) * dy[i] / dx[i]
+        # 保留 dy/dx 两个量而不是合并成斜率，保证与逐段计算的结果逐位一致
+        self.x0: List[float] = self.xs[:-1]
+        self.y0: List[float] = list(ys[:-1])
+        self.dx: List[float] = [self.xs[i + 1] - self.xs[i] for i in range(len(self.xs) - 1)]
+        self.dy: List[float] = [ys[i + 1] - ys[i] for i in range(len(ys) - 1)]
+        self._arrays = None
+
+    @classmethod
+    def from_points(cls, points: List[Dict[str, float]], x_key: str, y_key: str) -> 'SegmentTable':
+        """由分度表数据点构建查找表"""
+        ordered = sorted(points, key=lambda p: p[x_key])
+        return cls([p[x_key] for p in ordered], [p[y_key] for p in ordered])
+
+    def lookup(self, x: float) -> Optional[float]:
+        """二分查找所在区间并线性插值，超出断点范围时返回 None"""
+        xs = self.xs
+        if not xs[0] <= x <= xs[-1]:
+            return None
+        i = bisect_left(xs, x) - 1
+        if i < 0:
+            i = 0
+        return self.y0[i] + (x - self.x0[i]) * self.dy[i] / self.dx[i]
+
+    def lookup_many(self, values):
+        """批量查找，超出断点范围的位置为 NaN
+
+        有 numpy 时一次 searchsorted 定位全部区间后整体插值，返回 ndarray；
+        否则逐个调用 lookup，返回 list。
+        """
+        np = get_numpy()
+        if np is None:
+            nan = math.nan
+            result = []
+            for x in values:
+                y = self.lookup(x)
+                result.append(nan if y is None else y)
+            return result
+
+        if self._arrays is None:
+            self._arrays = tuple(np.asarray(a, dtype=float)
+                                 for a in (self.xs, self.x0, self.y0, self.dx, self.dy))
+        xs, x0, y0, dx, dy = self._arrays
+        x = np.asarray(values, dtype=float)
+        i = np.searchsorted(xs, x, side='left') - 1
+        np.clip(i, 0, len(x0) - 1, out=i)
+        y = y0[i] + (x - x0[i]) * dy[i] / dx[i]
+        y[~((x >= xs[0]) & (x <= xs[-1]))] = np.nan
+        return y
+
+class MonotoneCubicTable:
+    """分段三次 Hermite (PCHIP) 保单调插值表
+
+    断点处的导数按 Fritsch-Carlson 方法取相邻两段斜率的加权调和平均，
+    两段斜率异号或为零时取 0，因此数据单调时曲线也单调、不会在断点之间过冲。
+    每段的多项式系数在构建时算好，查找时二分定位区间后只做一次 Horner 求值。
+    断点很少时比线性插值准确得多，例如 E、S 型只有 4 个断点。
+    """
+    __slots__ = ('xs', 'x0', 'a', 'b', 'c', 'd', '_arrays')
+
+    def __init__(self, xs: Sequence[float], ys: Sequence[float]):
+        n = len(xs)
+        if n != len(ys) or n < 2:
+            raise ValueError("分度表至少需要两个断点")
+        xs = [float(x) for x in xs]
+        ys = [float(y) for y in ys]
+        h = [xs[i + 1] - xs[i] for i in range(n - 1)]
+        if min(h) <= 0:
+            raise ValueError("断点的自变量必须严格递增")
+        delta = [(ys[i + 1] - ys[i]) / h[i] for i in range(n - 1)]
+        slopes = _pchip_slopes(h, delta)
+        self.xs: List[float] = xs
+        # 第 i 段: y = a + t * (b + t * (c + t * d))，t = x - x0[i]
+        self.x0: List[float] = xs[:-1]
+        self.a: List[float] = ys[:-1]
+        self.b: List[float] = slopes[:-1]
+        self.c: List[float] = [(3 * delta[i] - 2 * slopes[i] - slopes[i + 1]) / h[i] for i in range(n - 1)]
+        self.d: List[float] = [(slopes[i] + slopes[i + 1] - 2 * delta[i]) / (h[i] * h[i]) for i in range(n - 1)]
+        self._arrays = None
+
+    @classmethod
+    def from_points(cls, points: List[Dict[str, float]], x_key: str, y_key: str) -> 'MonotoneCubicTable':
+        """由分度表数据点构建插值表"""
+        ordered = sorted(points, key=lambda p: p[x_key])
+        return cls([p[x_key] for p in ordered], [p[y_key] for p in ordered])
+
+    def lookup(self, x: float) -> Optional[float]:
+        """二分查找所在区间并求值，超出断点范围时返回 None"""
+        xs = self.xs
+        if not xs[0] <= x <= xs[-1]:
+            return None
+        i = bisect_left(xs, x) - 1
+        if i < 0:
+            i = 0
+        t = x - self.x0[i]
+        return self.a[i] + t * (self.b[i] + t * (self.c[i] + t * self.d[i]))
+
+    def lookup_many(self, values):
+        """批量查找，超出断点范围的位置为 NaN，约定同 SegmentTable.lookup_many"""
+        np = get_numpy()
+        if np is None:
+            nan = math.nan
+            result = []
+            for x in values:
+                y = self.lookup(x)
+                result.append(nan if y is None else y)
+            return result
+
+        if self._arrays is None:
+            self._arrays = tuple(np.asarray(v, dtype=float)
+                                 for v in (self.xs, self.x0, self.a, self.b, self.c, self.d))
+        xs, x0, a, b, c, d = self._arrays
+        x = np.asarray(values, dtype=float)
+        i = np.searchsorted(xs, x, side='left') - 1
+        np.clip(i, 0, len(x0) - 1, out=i)
+        t = x - x0[i]
+        y = a[i] + t * (b[i] + t * (c[i] + t * d[i]))
+        y[~((x >= xs[0]) & (x <= xs[-1]))] = np.nan
+        return y
+
+    def inverse(self, density: int = 16) -> 'MonotoneCubicTable':
+        """反函数的插值表 (曲线须严格单调)
+
+        在每段内取 density 个等分点求值，交换坐标后构建 PCHIP。只用原断点 (density=1)
+        时正反两张表各自插值，往返误差与插值误差同量级；加密后反向表贴合正向曲线，
+        查找仍只是一次三次多项式求值，只是断点多一些。
+        """
+        if density < 1:
+            raise ValueError("反向表加密倍数必须不小于1")
+        xs = []
+        for x0, x1 in zip(self.xs, self.xs[1:]):
+            xs.extend(x0 + (x1 - x0) * j / density for j in range(density))
+        xs.append(self.xs[-1])
+        ys = [self.lookup(x) for x in xs]
+        if any(y1 <= y0 for y0, y1 in zip(ys, ys[1:])):
+            raise ValueError("分度曲线不是严格单调的，无法构建反向表")
+        return MonotoneCubicTable(ys, xs)
+
+def _pchip_slopes(h: List[float], delta: List[float]) -> List[float]:
+    """各断点处的导数 (与 SciPy PchipInterpolator 相同的取法)"""
+    n = len(h) + 1
+    if n == 2:
+        return [delta[0], delta[0]]
+    slopes = [0.0] * n
+    for k in range(1, n - 1):
+        d0, d1 = delta[k - 1], delta[k]
+        if d0 * d1 > 0:
+            w1 = 2 * h[k] + h[k - 1]
+            w2 = h[k] + 2 * h[k - 1]
+            slopes[k] = (w1 + w2) / (w1 / d0 + w2 / d1)
+    slopes[0] = _pchip_end_slope(h[0], h[1], delta[0], delta[1])
+    slopes[-1] = _pchip_end_slope(h[-1], h[-2], delta[-1], delta[-2])
+    return slopes
+
+def _pchip_end_slope(h0: float, h1: float, d0: float, d1: float) -> float:
+    """端点导数: 三点公式，并限制为与端段同号且不超过端段斜率的 3 倍"""
+    slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+    if slope * d0 <= 0:
+        return 0.0
+    if d0 * d1 < 0 and abs(slope) > abs(3 * d0):
+        return 3 * d0
+    return slope
+
+class UniformGrid:
+    """等间距网格查找表
+
+    加载时把曲线重采样到固定步长的网格上，查找只需下标运算和一次插值，
+    没有任何搜索。范围不是步长整数倍时，最后一个点位于 x_end，
+    最后一个单元按实际宽度插值。
+    """
+    __slots__ = ('x0', 'step', 'inv_step', 'ys', 'last', 'x_end', 'pos_end', 'last_width', '_array')
+
+    def __init__(self, x0: float, step: float, ys: Sequence[float], x_end: Optional[float] = None):
+        if step <= 0:
+            raise ValueError("网格步长必须大于0")
+        if len(ys) < 2:
+            raise ValueError("网格至少需要两个点")
+        self.x0 = x0
+        self.step = step
+        self.inv_step = 1.0 / step
+        self.ys = array('d', ys)
+        self.last = len(self.ys) - 1
+        if x_end is None:
+            x_end = x0 + self.last * step
+        # 末点的网格位置，落在 (last - 1, last] 内
+        self.x_end = x_end
+        self.pos_end = (x_end - x0) * self.inv_step
+        self.last_width = self.pos_end - (self.last - 1)
+        if not 0 < self.last_width <= 1 + 1e-9:
+            raise ValueError("网格末点必须落在最后一个单元内")
+        self._array = None
+
+    @classmethod
+    def resample(cls, source, x_min: float, x_max: float, step: float) -> 'UniformGrid':
+        """在 [x_min, x_max] 上按 step 对 source.lookup 重采样
+
+        网格点取 x_min + i * step，最后一个点取 x_max (范围不是步长整数倍时最后一个单元较窄)。
+        """
+        # 减去一个极小量，避免浮点误差在整数倍时多出一个几乎为零宽的单元
+        cells = max(int(math.ceil((x_max - x_min) / step - 1e-9)), 1)
+        xs = [x_min + i * step for i in range(cells)]
+        xs.append(x_max)
+        ys = []
+        for x in xs:
+            y = source.lookup(x)
+            if y is None:
+                raise ValueError(f"重采样点超出源数据范围: {x}")
+            ys.append(y)
+        return cls(x_min, step, ys, x_max)
+
+    @property
+    def nbytes(self) -> int:
+        """网格数据占用的内存(字节)"""
+        return self.ys.itemsize * len(self.ys)
+
+    def lookup(self, x: float) -> Optional[float]:
+        """按下标直接定位网格并线性插值，超出网格时返回 None"""
+        pos = (x - self.x0) * self.inv_step
+        if not 0 <= pos <= self.pos_end:
+            return None
+        i = int(pos)
+        frac = pos - i
+        if i >= self.last - 1:
+            i = self.last - 1
+            frac = (pos - i) / self.last_width
+        y0 = self.ys[i]
+        return y0 + (self.ys[i + 1] - y0) * frac
+
+    def lookup_many(self, values):
+        """批量查找，超出网格的位置为 NaN"""
+        np = get_numpy()
+        if np is None:
+            nan = math.nan
+            result = []
+            for x in values:
+                y = self.lookup(x)
+                result.append(nan if y is None else y)
+            return result
+
+        if self._array is None:
+            self._array = np.frombuffer(self.ys, dtype=float)
+        ys = self._array
+        pos = (np.asarray(values, dtype=float) - self.x0) * self.inv_step
+        outside = ~((pos >= 0) & (pos <= self.pos_end))
+        pos[outside] = 0.0
+        i = np.minimum(pos.astype(np.intp), self.last - 1)
+        frac = pos - i
+        if self.last_width != 1.0:
+            frac[i == self.last - 1] /= self.last_width
+        y = ys[i] + (ys[i + 1] - ys[i]) * frac
+        y[outside] = np.nan
+        return y
+
+    def max_error(self, source) -> float:
+        """与源曲线的最大绝对误差
+
+        在每个网格单元的中点以及源数据断点处比较，线性源的最大误差出现在断点，
+        多项式源的最大误差出现在单元中点附近。
+        """
+        x_max = self.x_end
+        xs = [self.x0 + (i + 0.5) * self.step for i in range(self.last - 1)]
+        xs.append((self.x0 + (self.last - 1) * self.step + x_max) / 2)
+        xs.append(x_max)
+        xs.extend(x for x in getattr(source, 'xs', ()) if self.x0 <= x <= x_max)
+        error = 0.0
+        for x in xs:
+            y = self.lookup(x)
+            ref = source.lookup(x)
+            if y is not None and ref is not None:
+                error = max(error, abs(y - ref))
+        return error
+
+def build_segment_tables(type_name: str, info: Dict) -> Tuple:
+    """由分度表构建正向和反向分段线性查找表
+
+    二进制分度表按列给出数据 ('temps'/'mvs')，直接在映射的缓冲区上查找。
+    """
+    if 'data' not in info:
+        import tablefile
+        return (tablefile.BufferTable(info['temps'], info['mvs']),
+                tablefile.BufferTable(info['mvs'], info['temps']))
+    return (SegmentTable.from_points(info['data'], 'temp', 'mv'),
+            SegmentTable.from_points(info['data'], 'mv', 'temp'))
+
+def build_pchip_tables(type_name: str, info: Dict,
+                       inverse_density: int = 16) -> Tuple[MonotoneCubicTable, MonotoneCubicTable]:
+    """由分度表构建正向保单调三次插值表及其反向表
+
+    反向表在正向曲线每段上取 inverse_density 个点后交换坐标构建 (见 MonotoneCubicTable.inverse)，
+    与正向表互为反函数，正反两个方向每次查找都只求值一个三次多项式。
+    """
+    if 'data' not in info:
+        forward = MonotoneCubicTable(list(info['temps']), list(info['mvs']))
+    else:
+        forward = MonotoneCubicTable.from_points(info['data'], 'temp', 'mv')
+    return forward, forward.inverse(inverse_density)
+
+def build_grid_tables(type_name: str, info: Dict, temp_step: float = 1.0,
+                      mv_step: float = 0.001, source: str = 'table') -> Tuple[UniformGrid, UniformGrid]:
+    """把 source 引擎的曲线重采样为等间距网格 (默认正向 1°C、反向 1µV)"""
+    if source not in ENGINES or source == 'grid':
+        raise ValueError(f"不支持的网格源引擎: {source}")
+    forward, inverse = ENGINES[source](type_name, info)
+    range_data = info['range']
+    return (UniformGrid.resample(forward, range_data['temp_min'], range_data['temp_max'], temp_step),
+            UniformGrid.resample(inverse, range_data['mv_min'], range_data['mv_max'], mv_step))
+
+# 转换引擎: 名称 -> 构建函数(type_name, 类型数据, **引擎参数) -> (正向表, 反向表)
+# 每个表对象都提供 lookup / lookup_many 两个方法
+ENGINES = {
+    'table': build_segment_tables,
+    'its90': its90.build_tables,
+    'grid': build_grid_tables,
+    'pchip': build_pchip_tables,
+}
+
+class TypeConverter:
+    """单一类型的热电偶转换器
+
+    构建后查找表和范围都不再改变，可以在多个线程之间自由共享；
+    也可以被 pickle 发送到子进程。冷端补偿缓存是整体替换的单个元组，
+    并发访问时最坏情况只是多算一次。
+    """
+    __slots__ = ('type_name', 'name', 'forward', 'inverse', 'temp_bounds', 'mv_bounds', '_cj_cache')
+
+    def __init__(self, type_name: str, info: Dict, forward, inverse):
+        range_data = info['range']
+        self.type_name = type_name
+        self.name = info.get('name', type_name)
+        self.forward = forward
+        self.inverse = inverse
+        self.temp_bounds: Tuple[float, float] = (range_data['temp_min'], range_data['temp_max'])
+        self.mv_bounds: Tuple[float, float] = (range_data['mv_min'], range_data['mv_max'])
+        # 冷端补偿缓存: (冷端温度, 冷端热电势)
+        self._cj_cache: Tuple = (None, None)
+
+    def temp_to_mv(self, temp: float) -> Optional[float]:
+        """温度转换为热电势"""
+        temp_min, temp_max = self.temp_bounds
+        if not temp_min <= temp <= temp_max:
+            raise ValueError(
+                f"温度超出范围 ({temp_min}°C ~ {temp_max}°C)"
+            )
+        return self.forward.lookup(temp)
+
+    def mv_to_temp(self, mv: float) -> Optional[float]:
+        """热电势转换为温度"""
+        mv_min, mv_max = self.mv_bounds
+        if not mv_min <= mv <= mv_max:
+            raise ValueError(
+                f"热电势超出范围 ({mv_min}mV ~ {mv_max}mV)"
+            )
+        return self.inverse.lookup(mv)
+
+    def temp_to_mv_many(self, temps, return_mask: bool = False):
+        """批量温度转换为热电势
+
+        超出范围的元素不抛出异常，结果置为 NaN；return_mask 为 True 时
+        同时返回超限掩码 (True 表示该元素超出范围)。
+        """
+        return self._convert_many(self.forward, self.temp_bounds, temps, return_mask)
+
+    def mv_to_temp_many(self, mvs, return_mask: bool = False):
+        """批量热电势转换为温度，约定同 temp_to_mv_many"""
+        return self._convert_many(self.inverse, self.mv_bounds, mvs, return_mask)
+
+    def cj_offset(self, cj_temp: float) -> float:
+        """冷端温度对应的热电势，冷端温度不变时直接返回缓存值"""
+        cached_temp, cached_mv = self._cj_cache
+        if cached_temp == cj_temp:
+            return cached_mv
+        temp_min, temp_max = self.temp_bounds
+        if not temp_min <= cj_temp <= temp_max:
+            raise ValueError(
+                f"冷端温度超出范围 ({temp_min}°C ~ {temp_max}°C)"
+            )
+        offset = self.forward.lookup(cj_temp)
+        if offset is None:
+            raise ValueError(f"无法计算冷端温度 {cj_temp}°C 的热电势")
+        self._cj_cache = (cj_temp, offset)
+        return offset
+
+    def mv_to_temp_cjc(self, mv: float, cj_temp: float) -> Optional[float]:
+        """带冷端补偿的热电势转换为温度
+
+        mv 为实测热电势，cj_temp 为参考端(冷端)温度，
+        按 E(t) = mv + E(cj_temp) 直接在预编译表上完成补偿和反查。
+        """
+        total = mv + self.cj_offset(cj_temp)
+        mv_min, mv_max = self.mv_bounds
+        if not mv_min <= total <= mv_max:
+            raise ValueError(
+                f"补偿后热电势超出范围 ({mv_min}mV ~ {mv_max}mV)"
+            )
+        return self.inverse.lookup(total)
+
+    def mv_to_temp_cjc_many(self, mvs, cj_temps, return_mask: bool = False):
+        """批量冷端补偿转换
+
+        cj_temps 可以是单个冷端温度(整批共用一次补偿值)或与 mvs 等长的序列。
+        冷端温度或补偿后热电势超出范围的元素置为 NaN，约定同 mv_to_temp_many。
+        """
+        np = get_numpy()
+        # numpy 标量 (np.float32、np.int64 等) 和 0 维数组都有 ndim == 0，按单个冷端温度处理
+        if isinstance(cj_temps, (int, float)) or getattr(cj_temps, 'ndim', None) == 0:
+            try:
+                offset = self.cj_offset(float(cj_temps))
+            except ValueError:
+                offset = math.nan
+            if np is None:
+                totals = [mv + offset for mv in mvs]
+            else:
+                totals = np.asarray(mvs, dtype=float) + offset
+            return self._convert_many(self.inverse, self.mv_bounds, totals, return_mask)
+
+        if np is None:
+            totals = []
+            for mv, cj_temp in zip(mvs, cj_temps):
+                try:
+                    totals.append(mv + self.cj_offset(cj_temp))
+                except ValueError:
+                    totals.append(math.nan)
+        else:
+            mvs = np.asarray(mvs, dtype=float)
+            cj_temps = np.asarray(cj_temps, dtype=float)
+            if mvs.shape != cj_temps.shape:
+                raise ValueError("热电势与冷端温度的数量不一致")
+            # 冷端温度变化缓慢，只对不同的取值各查一次表
+            unique, inverse = np.unique(cj_temps, return_inverse=True)
+            offsets = self._convert_many(self.forward, self.temp_bounds, unique, False)
+            totals = mvs + offsets[inverse]
+        return self._convert_many(self.inverse, self.mv_bounds, totals, return_mask)
+
+    @staticmethod
+    def _convert_many(table, bounds: Tuple[float, float], values, return_mask: bool):
+        """按范围检查后批量查表"""
+        np = get_numpy()
+        low, high = bounds
+        if np is None:
+            values = list(values)
+            mask = [not low <= x <= high for x in values]
+            result = table.lookup_many(values)
+            for i, out in enumerate(mask):
+                if out:
+                    result[i] = math.nan
+        else:
+            values = np.asarray(values, dtype=float)
+            mask = ~((values >= low) & (values <= high))
+            result = table.lookup_many(values)
+            result[mask] = np.nan
+        return (result, mask) if return_mask else result
+
+class ConverterStats:
+    """转换调用统计
+
+    按 (类型, 操作) 记录调用次数、转换值个数、超限次数、返回 None (界面显示
+    "计算错误") 的次数，以及以 2 的幂为桶宽的耗时直方图 (纳秒)。
+    计数在 GIL 下直接累加，不加锁，多线程并发时允许极少量误差。
+    """
+    BUCKETS = 64
+
+    def __init__(self):
+        self.started = time.time()
+        # 每项: [调用次数, 值个数, 超限个数, None 个数, 总耗时ns, 最大耗时ns, 直方图]
+        self._metrics: Dict[Tuple[str, str], list] = {}
+
+    def record(self, type_name: str, op: str, elapsed_ns: int, values: int = 1,
+               out_of_range: int = 0, none: int = 0) -> None:
+        """记录一次调用"""
+        metric = self._metrics.get((type_name, op))
+        if metric is None:
+            metric = self._metrics[(type_name, op)] = [0, 0, 0, 0, 0, 0, [0] * self.BUCKETS]
+        metric[0] += 1
+        metric[1] += values
+        metric[2] += out_of_range
+        metric[3] += none
+        metric[4] += elapsed_ns
+        if elapsed_ns > metric[5]:
+            metric[5] = elapsed_ns
+        metric[6][min(elapsed_ns.bit_length(), self.BUCKETS - 1)] += 1
+
+    @staticmethod
+    def _percentile(histogram: List[int], calls: int, p: float) -> int:
+        """由直方图估算分位数，返回所在桶的上界(ns)"""
+        target = p * calls
+        seen = 0
+        for bucket, count in enumerate(histogram):
+            seen += count
+            if count and seen >= target:
+                return 1 << bucket
+        return 0
+
+    def snapshot(self) -> Dict:
+        """导出统计数据: {类型: {操作: 指标}}"""
+        now = time.time()
+        elapsed = now - self.started
+        result: Dict = {'started': self.started, 'elapsed': elapsed, 'types': {}}
+        for (type_name, op), metric in list(self._metrics.items()):
+            calls, values, out_of_range, none, total_ns, max_ns, histogram = metric
+            histogram = list(histogram)
+            result['types'].setdefault(type_name, {})[op] = {
+                'calls': calls,
+                'values': values,
+                'out_of_range': out_of_range,
+                'none': none,
+                'calls_per_sec': calls / elapsed if elapsed > 0 else 0.0,
+                'latency_ns': {
+                    'mean': total_ns / calls if calls else 0.0,
+                    'p50': self._percentile(histogram, calls, 0.50),
+                    'p90': self._percentile(histogram, calls, 0.90),
+                    'p99': self._percentile(histogram, calls, 0.99),
+                    'max': max_ns,
+                },
+                'histogram': {1 << b: n for b, n in enumerate(histogram) if n},
+            }
+        return result
+
+class KTypeConverter:
+    """热电偶转换器
+
+    持有全部类型的 TypeConverter，并通过 set_type 选择当前类型供界面使用。
+    多线程场景请用 get_converter 取得各类型的不可变转换器，不要共享 set_type 状态。
+    """
+
+    def __init__(self, engine: str = 'table', data_file: Optional[str] = None,
+                 temp_range: Optional[Tuple[float, float]] = None, **engine_options):
+        if engine not in ENGINES:
+            raise ValueError(f"不支持的转换引擎: {engine}")
+        self.data_file = data_file
+        # 只加载该温度段的分度表，仅对 SQLite 数据源有效
+        self.temp_range = temp_range
+        self.types: Dict[str, Dict] = {}
+        self.converters: Dict[str, TypeConverter] = {}
+        self.engine: str = engine
+        self.engine_options: Dict = engine_options
+        self.current_type: str = "K"
+        # 量化结果缓存 (functools.lru_cache 包装的 _quantized_convert)，None 表示未启用
+        self._cache = None
+        self._cache_resolution: Tuple[float, float] = (0.0, 0.0)
+        self._cache_totals: Dict[str, int] = {}
+        # 运行统计，enable_instrumentation 后才有值
+        self.stats: Optional[ConverterStats] = None
+        self._dump_timer = None
+        self.load_data()
+        
+    def load_data(self) -> None:
+        """加载热电偶分度表数据
+
+        默认读取程序目录下的 thermocouple_data.json；data_file 指定
+        .tctb 二进制分度表时改为内存映射加载，指定 .db 时从 SQLite 数据库加载。
+        数据库未变化时重复调用直接复用已编译的分度表。
+        """
+        # json 依赖 re，导入较慢，只在加载数据时导入以缩短模块导入时间
+        import json
+        try:
+            if self.data_file is not None:
+                data_file = os.fspath(self.data_file)
+            else:
+                if getattr(sys, 'frozen', False):
+                    base_path = sys._MEIPASS
+                else:
+                    base_path = os.path.dirname(os.path.abspath(__file__))
+                data_file = os.path.join(base_path, 'thermocouple_data.json')
+            print(f"尝试加载数据文件: {data_file}")
+            
+            if not os.path.exists(data_file):
+                raise FileNotFoundError(f"文件不存在: {data_file}")
+
+            # 二进制和数据库分度表的模块 (mmap、sqlite3) 只在用到时导入，默认的 JSON 路径不加载
+            if data_file.endswith('.tctb'):
+                import tablefile
+                self.types = tablefile.load_tables(data_file)
+                self.compile_tables()
+                print("数据加载成功")
+                return
+
+            if data_file.endswith('.db'):
+                import tabledb
+                types = tabledb.load_tables(data_file, temp_range=self.temp_range)
+                if types is not self.types:
+                    self.types = types
+                    self.compile_tables()
+                print("数据加载成功")
+                return
+
+            with open(data_file, 'r', encoding='utf-8', errors='ignore') as f:
+                data = json.load(f)
+                if 'types' not in data:
+                    raise json.JSONDecodeError("数据格式错误：缺少类型数据", "", 0)
+                self.types = data['types']
+                self.compile_tables()
+                print("数据加载成功")
+        except FileNotFoundError as e:
+            raise RuntimeError(f"找不到数据文件: {str(e)}")
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"数据文件格式错误: {str(e)}")
+        except Exception as e:
+            raise RuntimeError(f"加载数据时发生错误: {str(e)}")
+
+    def compile_tables(self) -> None:
+        """用当前引擎为每种类型预编译正向(温度→热电势)和反向(热电势→温度)查找表"""
+        build = ENGINES[self.engine]
+        self.converters = {name: TypeConverter(name, info, *build(name, info, **self.engine_options))
+                           for name, info in self.types.items()}
+        if self._cache is not None:
+            self._clear_cache()  # 分度表或引擎变化后旧结果失效
+        if self.current_type not in self.converters:
+            self.current_type = next(iter(self.converters))
+        self.set_type(self.current_type)
+
+    def set_engine(self, engine: str, **options) -> None:
+        """切换转换引擎
+
+        'table' 分度表线性插值 / 'pchip' 分度表保单调三次插值 (参数 inverse_density) /
+        'its90' 标准多项式 /
+        'grid' 等间距网格 (参数 temp_step、mv_step、source)
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"不支持的转换引擎: {engine}")
+        previous = self.engine, self.engine_options
+        self.engine, self.engine_options = engine, options
+        try:
+            self.compile_tables()
+        except (TypeError, ValueError):
+            self.engine, self.engine_options = previous
+            raise
+
+    def grid_report(self) -> Dict[str, Dict[str, float]]:
+        """网格引擎各类型的内存占用和相对源曲线的最大误差"""
+        if self.engine != 'grid':
+            raise ValueError("当前引擎不是网格模式")
+        source = ENGINES[self.engine_options.get('source', 'table')]
+        report = {}
+        for name, conv in self.converters.items():
+            src_forward, src_inverse = source(name, self.types[name])
+            report[name] = {
+                'temp_points': len(conv.forward.ys),
+                'mv_points': len(conv.inverse.ys),
+                'memory_bytes': conv.forward.nbytes + conv.inverse.nbytes,
+                'max_error_mv': conv.forward.max_error(src_forward),
+                'max_error_temp': conv.inverse.max_error(src_inverse),
+            }
+        return report
+
+    def enable_cache(self, temp_resolution: float = 0.01, mv_resolution: float = 0.001,
+                     maxsize: int = 4096) -> None:
+        """启用单值转换结果缓存
+
+        输入按 temp_resolution (°C) / mv_resolution (mV) 量化，以
+        (类型, 方向, 量化值) 为键放入有界 LRU 缓存。结果按量化后的输入计算，
+        同一量化区间内的输入得到相同的结果。重新加载分度表或切换引擎时缓存自动清空。
+        """
+        if temp_resolution <= 0 or mv_resolution <= 0:
+            raise ValueError("量化分辨率必须大于0")
+        if maxsize <= 0:
+            raise ValueError("缓存容量必须大于0")
+        self._cache_resolution = (temp_resolution, mv_resolution)
+        self._cache_totals = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._cache = lru_cache(maxsize=maxsize)(self._quantized_convert)
+
+    def disable_cache(self) -> None:
+        """关闭结果缓存"""
+        self._cache = None
+
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        """缓存命中统计 (自启用以来累计)，未启用缓存时返回 None"""
+        if self._cache is None:
+            return None
+        info = self._cache.cache_info()
+        hits = self._cache_totals['hits'] + info.hits
+        misses = self._cache_totals['misses'] + info.misses
+        return {
+            'size': info.currsize,
+            'maxsize': info.maxsize,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'invalidations': self._cache_totals['invalidations'],
+        }
+
+    def _clear_cache(self) -> None:
+        """清空缓存，保留累计统计"""
+        info = self._cache.cache_info()
+        self._cache_totals['hits'] += info.hits
+        self._cache_totals['misses'] += info.misses
+        self._cache_totals['invalidations'] += 1
+        self._cache.cache_clear()
+
+    def _quantized_convert(self, type_name: str, to_mv: bool, q: int) -> Optional[float]:
+        """按量化值计算转换结果，量化点超出范围时截取到边界"""
+        conv = self.converters[type_name]
+        if to_mv:
+            low, high = conv.temp_bounds
+            return conv.forward.lookup(min(max(q * self._cache_resolution[0], low), high))
+        low, high = conv.mv_bounds
+        return conv.inverse.lookup(min(max(q * self._cache_resolution[1], low), high))
+
+    # 可统计的转换方法及其位置参数个数 (批量方法不含 return_mask)
+    _SCALAR_OPS = ('temp_to_mv', 'mv_to_temp', 'mv_to_temp_cjc')
+    _BATCH_OPS = {'temp_to_mv_many': 1, 'mv_to_temp_many': 1, 'mv_to_temp_cjc_many': 2}
+
+    def enable_instrumentation(self, dump_interval: Optional[float] = None, sink=None) -> None:
+        """启用转换统计
+
+        统计通过在实例上安装包装方法实现，关闭后包装方法被移除，
+        转换路径恢复为原始方法，没有任何额外开销。
+        dump_interval 不为 None 时每隔该秒数把快照交给 sink (默认打印到标准错误)。
+        """
+        self.stats = ConverterStats()
+        for name in self._SCALAR_OPS:
+            setattr(self, name, self._instrument_scalar(name))
+        for name, arity in self._BATCH_OPS.items():
+            setattr(self, name, self._instrument_batch(name, arity))
+        if dump_interval is not None:
+            self.start_periodic_dump(dump_interval, sink)
+
+    def disable_instrumentation(self) -> None:
+        """关闭转换统计并移除包装方法"""
+        self.stop_periodic_dump()
+        for name in (*self._SCALAR_OPS, *self._BATCH_OPS):
+            self.__dict__.pop(name, None)
+        self.stats = None
+
+    def stats_snapshot(self, reset: bool = False) -> Optional[Dict]:
+        """获取统计快照，reset 为 True 时同时清零，未启用统计时返回 None"""
+        stats = self.stats
+        if stats is None:
+            return None
+        if reset:
+            self.reset_stats()
+        return stats.snapshot()
+
+    def reset_stats(self) -> None:
+        """清零统计，包装方法随之记录到新的统计对象"""
+        if self.stats is not None:
+            self.stats = ConverterStats()
+
+    def start_periodic_dump(self, interval: float, sink=None, reset: bool = True) -> None:
+        """在后台线程中周期输出统计快照"""
+        import threading
+        if self.stats is None:
+            raise ValueError("未启用转换统计")
+        if interval <= 0:
+            raise ValueError("输出周期必须大于0")
+        if sink is None:
+            import json
+
+            def sink(snapshot):
+                print(json.dumps(snapshot, ensure_ascii=False), file=sys.stderr)
+
+        self.stop_periodic_dump()
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                snapshot = self.stats_snapshot(reset=reset)
+                if snapshot is not None:
+                    sink(snapshot)
+
+        thread = threading.Thread(target=run, name='converter-stats-dump', daemon=True)
+        self._dump_timer = (stop, thread)
+        thread.start()
+
+    def stop_periodic_dump(self) -> None:
+        """停止周期输出"""
+        if self._dump_timer is not None:
+            stop, thread = self._dump_timer
+            stop.set()
+            thread.join()
+            self._dump_timer = None
+
+    def _instrument_scalar(self, name: str):
+        """包装单值转换方法: 记录耗时、超限异常和 None 结果"""
+        method = getattr(type(self), name).__get__(self)
+        clock = time.perf_counter_ns
+
+        def wrapper(*args):
+            start = clock()
+            try:
+                result = method(*args)
+            except ValueError:
+                self.stats.record(self.current_type, name, clock() - start, out_of_range=1)
+                raise
+            self.stats.record(self.current_type, name, clock() - start, none=int(result is None))
+            return result
+
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    def _instrument_batch(self, name: str, arity: int):
+        """包装批量转换方法: 借助超限掩码统计超限个数"""
+        method = getattr(type(self), name).__get__(self)
+        clock = time.perf_counter_ns
+
+        def wrapper(*args, return_mask: bool = False):
+            if len(args) > arity:
+                args, return_mask = args[:arity], args[arity]
+            start = clock()
+            result, mask = method(*args, return_mask=True)
+            elapsed = clock() - start
+            self.stats.record(self.current_type, name, elapsed, values=len(mask), out_of_range=int(sum(mask)))
+            return (result, mask) if return_mask else result
+
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    def get_converter(self, type_name: str) -> TypeConverter:
+        """获取指定类型的不可变转换器，可跨线程共享"""
+        if type_name not in self.converters:
+            raise ValueError(f"不支持的热电偶类型: {type_name}")
+        return self.converters[type_name]
+
+    def set_type(self, type_name: str) -> None:
+        """设置当前热电偶类型"""
+        self._active = self.get_converter(type_name)
+        self.current_type = type_name
+
+    def get_current_range(self) -> Dict[str, float]:
+        """获取当前类型的范围"""
+        return self.types[self.current_type]['range']
+
+    def get_current_data(self) -> List[Dict[str, float]]:
+        """获取当前类型的数据"""
+        info = self.types[self.current_type]
+        if 'data' not in info:
+            return [{'temp': t, 'mv': mv} for t, mv in zip(info['temps'], info['mvs'])]
+        return info['data']
+
+    def temp_to_mv(self, temp: float) -> Optional[float]:
+        """温度转换为热电势"""
+        cache = self._cache
+        if cache is None:
+            return self._active.temp_to_mv(temp)
+        low, high = self._active.temp_bounds
+        if not low <= temp <= high:
+            return self._active.temp_to_mv(temp)  # 超限由转换器抛出异常，不进入缓存
+        return cache(self.current_type, True, round(temp / self._cache_resolution[0]))
+
+    def mv_to_temp(self, mv: float) -> Optional[float]:
+        """热电势转换为温度"""
+        cache = self._cache
+        if cache is None:
+            return self._active.mv_to_temp(mv)
+        low, high = self._active.mv_bounds
+        if not low <= mv <= high:
+            return self._active.mv_to_temp(mv)
+        return cache(self.current_type, False, round(mv / self._cache_resolution[1]))
+
+    def temp_to_mv_many(self, temps, return_mask: bool = False):
+        """批量温度转换为热电势，见 TypeConverter.temp_to_mv_many"""
+        return self._active.temp_to_mv_many(temps, return_mask)
+
+    def mv_to_temp_many(self, mvs, return_mask: bool = False):
+        """批量热电势转换为温度，见 TypeConverter.mv_to_temp_many"""
+        return self._active.mv_to_temp_many(mvs, return_mask)
+
+    def cj_offset(self, cj_temp: float) -> float:
+        """冷端温度对应的热电势"""
+        return self._active.cj_offset(cj_temp)
+
+    def mv_to_temp_cjc(self, mv: float, cj_temp: float) -> Optional[float]:
+        """带冷端补偿的热电势转换为温度，见 TypeConverter.mv_to_temp_cjc"""
+        return self._active.mv_to_temp_cjc(mv, cj_temp)
+
+    def mv_to_temp_cjc_many(self, mvs, cj_temps, return_mask: bool = False):
+        """批量冷端补偿转换，见 TypeConverter.mv_to_temp_cjc_many"""
+        return self._active.mv_to_temp_cjc_many(mvs, cj_temps, return_mask)
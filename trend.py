@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""实时曲线的数据部分 (不依赖 tkinter)
+
+RingBuffer 是固定容量的时间/数值环形缓冲区，采集线程写入、界面线程读取，
+长时间运行内存不增长。decimate 把可见时间窗内的数据按屏幕像素列做 最小/最大 抽取，
+每列只画一条竖线，无论采样率多高，绘制量都只与画布宽度有关，且不会丢掉尖峰。
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from compat import get_numpy
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import List, Optional, Sequence, Tuple
+
+class RingBuffer:
+    """固定容量的 (时间, 数值) 环形缓冲区，线程安全"""
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("缓冲区容量必须大于0")
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._values = array('d', bytes(8 * capacity))
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        # 每次写入加一，界面据此判断是否需要重绘
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, times: Sequence[float], values: Sequence[float]) -> None:
+        """追加一批数据，超出容量时覆盖最旧的数据"""
+        times = array('d', times)
+        values = array('d', values)
+        if len(times) != len(values):
+            raise ValueError("时间和数值个数不一致")
+        if len(times) > self.capacity:
+            times, values = times[-self.capacity:], values[-self.capacity:]
+        count = len(times)
+        with self._lock:
+            start = self._next
+            first = min(count, self.capacity - start)
+            self._times[start:start + first] = times[:first]
+            self._values[start:start + first] = values[:first]
+            rest = count - first
+            if rest:
+                self._times[:rest] = times[first:]
+                self._values[:rest] = values[first:]
+            self._next = (start + count) % self.capacity
+            self._size = min(self.capacity, self._size + count)
+            self.version += 1
+
+    def snapshot(self) -> Tuple[array, array]:
+        """按时间顺序复制出全部数据"""
+        with self._lock:
+            if self._size < self.capacity:
+                return self._times[:self._size], self._values[:self._size]
+            split = self._next
+            return (self._times[split:] + self._times[:split],
+                    self._values[split:] + self._values[:split])
+
+    def window(self, span: float) -> Tuple[array, array]:
+        """按时间顺序复制出最近 span 秒 (相对最新一个时间) 的数据
+
+        时间须按写入顺序递增；环形缓冲区是两段有序数据，在其中二分定位起点，
+        只复制可见时间窗，耗时与缓冲区总容量无关。
+        """
+        with self._lock:
+            size, times, values = self._size, self._times, self._values
+            if not size:
+                return array('d'), array('d')
+            if size < self.capacity:
+                older, newer = (0, size), (0, 0)
+            else:
+                older, newer = (self._next, self.capacity), (0, self._next)
+            t0 = times[(self._next - 1) % self.capacity] - span
+            # 起点在较旧的一段中时，较新的一段整段可见
+            if older[1] > older[0] and times[older[1] - 1] >= t0:
+                start = bisect_left(times, t0, *older)
+                return (times[start:older[1]] + times[newer[0]:newer[1]],
+                        values[start:older[1]] + values[newer[0]:newer[1]])
+            start = bisect_left(times, t0, *newer)
+            return times[start:newer[1]], values[start:newer[1]]
+
+    def clear(self) -> None:
+        """清空缓冲区"""
+        with self._lock:
+            self._next = 0
+            self._size = 0
+            self.version += 1
+
+def decimate(times: Sequence[float], values: Sequence[float], t0: float, t1: float,
+             width: int) -> Tuple[List[int], List[float], List[float]]:
+    """把 [t0, t1) 内的数据按 width 个像素列抽取为每列的最小值和最大值
+
+    times 须按升序排列。返回 (列号, 最小值, 最大值) 三个等长列表，
+    没有数据的列和 NaN 值被跳过。
+    """
+    if width <= 0 or t1 <= t0:
+        return [], [], []
+    scale = width / (t1 - t0)
+    np = get_numpy()
+    if np is not None:
+        t = np.frombuffer(times, dtype=float) if isinstance(times, array) else np.asarray(times, dtype=float)
+        v = np.frombuffer(values, dtype=float) if isinstance(values, array) else np.asarray(values, dtype=float)
+        lo, hi = np.searchsorted(t, (t0, t1), side='left')
+        t, v = t[lo:hi], v[lo:hi]
+        keep = ~np.isnan(v)
+        t, v = t[keep], v[keep]
+        if not len(t):
+            return [], [], []
+        cols = ((t - t0) * scale).astype(np.intp)
+        np.clip(cols, 0, width - 1, out=cols)
+        # 时间有序，列号单调不减，每列的起点即列号变化处
+        starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+        return (cols[starts].tolist(), np.minimum.reduceat(v, starts).tolist(),
+                np.maximum.reduceat(v, starts).tolist())
+
+    cols: List[int] = []
+    mins: List[float] = []
+    maxs: List[float] = []
+    # 纯 Python 路径 (运行环境没有安装 numpy 时): 二分定位每列的下标区间，
+    # 再用内置 min/max 在切片上求值，逐点工作都在 C 中完成
+    start, hi = bisect_left(times, t0), bisect_left(times, t1)
+    # 整个时间窗先求一次和判断有无 NaN，没有时各列不再逐列检查
+    has_nan = math.isnan(sum(values[start:hi]))
+    step = 1.0 / scale
+    for col in range(width):
+        if start >= hi:
+            break
+        stop = hi if col == width - 1 else bisect_left(times, t0 + (col + 1) * step, start, hi)
+        if stop > start:
+            chunk = values[start:stop]
+            low, high = min(chunk), max(chunk)
+            # min/max 遇到 NaN 结果不确定，只有含 NaN 的列才逐点过滤
+            if has_nan and math.isnan(sum(chunk)):
+                chunk = [v for v in chunk if v == v]
+                if not chunk:
+                    start = stop
+                    continue
+                low, high = min(chunk), max(chunk)
+            cols.append(col)
+            mins.append(low)
+            maxs.append(high)
+        start = stop
+    return cols, mins, maxs
+
+class SimulatedSource:
+    """模拟采集: 后台线程按 rate 采样/秒产生热电势，转换为温度后写入缓冲区"""
+
+    def __init__(self, buffer: RingBuffer, converter, rate: float = 5000.0, period: float = 0.01):
+        self.buffer = buffer
+        self.converter = converter  # TypeConverter
+        self.rate = rate
+        self.period = period
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """启动后台线程"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='trend-source', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        mv_min, mv_max = self.converter.mv_bounds
+        middle, amplitude = (mv_min + mv_max) / 2, (mv_max - mv_min) / 4
+        last = time.time()
+        while not self._stop.wait(self.period):
+            now = time.time()
+            count = max(1, int((now - last) * self.rate))
+            step = (now - last) / count
+            times = [last + (i + 1) * step for i in range(count)]
+            # 慢变化的正弦叠加少量噪声和偶发尖峰
+            mvs = [middle + amplitude * math.sin(t / 3) + amplitude * 0.02 * math.sin(t * 397)
+                   + (amplitude * 0.5 if int(t * 10) % 37 == 0 else 0.0) for t in times]
+            self.buffer.extend(times, self.converter.mv_to_temp_many(mvs))
+            last = now